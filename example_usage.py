@@ -9,97 +9,198 @@ with parallel processing for multiple images.
 import sys
 import os
 import argparse
+import asyncio
 import concurrent.futures
+import gc
+import socket
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import requests
+from urllib3.util.retry import Retry
 
 # Add the module directories to Python path
 sys.path.append(str(Path(__file__).parent / "videogeneration"))
 sys.path.append(str(Path(__file__).parent / "soundgeneration"))
 
-from videogeneration import generate_video_from_image
+from videogeneration import generate_video_from_image, generate_videos_from_images
 from soundgeneration import generate_sound_for_video
 
+# Workers spend their time blocked on upstream I/O, so default the pool
+# size from core count instead of a small fixed number; KAI_WORKERS overrides
+DEFAULT_WORKERS = int(os.environ.get('KAI_WORKERS', min(32, (os.cpu_count() or 1) * 8)))
 
-def generate_video_for_image(image_path: str, index: int, output_dir: str, custom_prompt: Optional[str] = None) -> Dict[str, Any]:
-    """Generate video for a single image with numbered output."""
-    try:
-        output_filename = f"video_{index+1:02d}.mp4"
-        output_path = os.path.join(output_dir, output_filename)
-
-        print(f"🎬 Generating video {index + 1} from: {os.path.basename(image_path)}")
-        
-        # Combine system prompt with custom prompt if provided
-        system_prompt = "smooth animation, natural movement, facial reactions and actions only, NO Lip movement, high quality"
-        if custom_prompt:
-            positive_prompt = f"{system_prompt}, {custom_prompt}"
-            print(f"   📝 Using custom prompt: {custom_prompt}")
-        else:
-            positive_prompt = system_prompt
 
-        result = generate_video_from_image(
-            image_path=image_path,
-            output_path=output_path,
-            positive_prompt=positive_prompt,
-            duration=5
-        )
+class _NoDelayAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter that disables Nagle's algorithm on new connections.
+
+    The API calls are small JSON writes followed by a wait for the
+    response; TCP_NODELAY sends them immediately instead of buffering.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)]
+        super().init_poolmanager(*args, **kwargs)
+
+
+# Shared HTTP session so parallel API calls reuse pooled keep-alive
+# connections instead of paying a TCP+TLS handshake per request
+_SESSION = requests.Session()
+_SESSION.mount('https://', _NoDelayAdapter(
+    pool_connections=64, pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+))
+
+
+async def generate_video_for_image(image_path: str, index: int, output_dir: str, semaphore: asyncio.Semaphore, custom_prompt: Optional[str] = None) -> Dict[str, Any]:
+    """Generate video for a single image with numbered output."""
+    output_filename = f"video_{index+1:02d}.mp4"
+    output_path = os.path.join(output_dir, output_filename)
+    img_base = os.path.basename(image_path)  # reused in every print/result path
 
-        print(f"✅ Video {index + 1} completed: {os.path.basename(output_path)}")
+    # Known failure mode checked up front instead of via exception
+    if not os.path.isfile(image_path):
+        print(f"❌ Video {index + 1} failed: {img_base} - image not found")
         return {
             'index': index,
             'image_path': image_path,
-            'video_path': output_path,
-            'video_url': result['videoURL'],
-            'success': True
+            'image_filename': img_base,
+            'success': False,
+            'error': f'Image not found: {image_path}'
         }
 
+    print(f"🎬 Generating video {index + 1} from: {img_base}")
+
+    # Combine system prompt with custom prompt if provided
+    system_prompt = "smooth animation, natural movement, facial reactions and actions only, NO Lip movement, high quality"
+    if custom_prompt:
+        positive_prompt = f"{system_prompt}, {custom_prompt}"
+        print(f"   📝 Using custom prompt: {custom_prompt}")
+    else:
+        positive_prompt = system_prompt
+
+    # Only the upstream call sits in the try block; the client wraps all of
+    # its failures (HTTP errors, timeouts, bad responses) in Exception.
+    # The underlying client is synchronous (requests), so run it in a
+    # worker thread; the semaphore caps how many run at once.
+    try:
+        async with semaphore:
+            result = await asyncio.to_thread(
+                generate_video_from_image,
+                image_path=image_path,
+                output_path=output_path,
+                positive_prompt=positive_prompt,
+                duration=5,
+                session=_SESSION
+            )
     except Exception as e:
-        print(f"❌ Video {index + 1} failed: {os.path.basename(image_path)} - {e}")
+        print(f"❌ Video {index + 1} failed: {img_base} - {e}")
         return {
             'index': index,
             'image_path': image_path,
+            'image_filename': img_base,
             'success': False,
             'error': str(e)
         }
 
+    print(f"✅ Video {index + 1} completed: {output_filename}")
+    return {
+        'index': index,
+        'image_path': image_path,
+        'image_filename': img_base,
+        'video_path': output_path,
+        'video_url': result['videoURL'],
+        'success': True
+    }
+
 
-def generate_sound_for_video_result(video_result: Dict[str, Any], output_dir: str) -> Dict[str, Any]:
+async def generate_sound_for_video_result(video_result: Dict[str, Any], output_dir: str, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
     """Generate sound for a single video with numbered output."""
-    try:
-        index = video_result['index']
-        
-        print(f"🎵 Adding sound to video {index + 1}: {os.path.basename(video_result['video_path'])}")
-        
-        sound_video_paths = generate_sound_for_video(
-            video_source=video_result['video_path'],  # Use local file (no re-download)
-            output_dir=output_dir,
-            output_prefix=f"sound_video_{index+1:02d}",
-            text_prompt="cinematic sound effects, ambient sounds, facial reactions, actions",
-            negative_prompt="speech, talking, dialogue, vocals, words",
-            duration=5,
-            creativity_coef=6
-        )
+    index = video_result['index']
+    video_path = video_result['video_path']
+    vid_base = os.path.basename(video_path)  # reused in every print/result path
 
-        print(f"✅ Sound {index + 1} completed: {len(sound_video_paths)} file(s)")
+    # Known failure mode checked up front instead of via exception
+    if not os.path.isfile(video_path):
+        print(f"❌ Sound {index + 1} failed: {vid_base} - video not found")
         return {
             'index': index,
-            'video_path': video_result['video_path'],
-            'sound_video_paths': sound_video_paths,
-            'success': True
+            'video_path': video_path,
+            'video_filename': vid_base,
+            'success': False,
+            'error': f'Video not found: {video_path}'
         }
 
+    print(f"🎵 Adding sound to video {index + 1}: {vid_base}")
+
+    try:
+        async with semaphore:
+            sound_video_paths = await asyncio.to_thread(
+                generate_sound_for_video,
+                video_source=video_path,  # Use local file (no re-download)
+                output_dir=output_dir,
+                output_prefix=f"sound_video_{index+1:02d}",
+                text_prompt="cinematic sound effects, ambient sounds, facial reactions, actions",
+                negative_prompt="speech, talking, dialogue, vocals, words",
+                duration=5,
+                creativity_coef=6,
+                session=_SESSION
+            )
     except Exception as e:
-        print(f"❌ Sound {index + 1} failed: {os.path.basename(video_result['video_path'])} - {e}")
+        print(f"❌ Sound {index + 1} failed: {vid_base} - {e}")
         return {
             'index': index,
-            'video_path': video_result['video_path'],
+            'video_path': video_path,
+            'video_filename': vid_base,
             'success': False,
             'error': str(e)
         }
 
+    print(f"✅ Sound {index + 1} completed: {len(sound_video_paths)} file(s)")
+    return {
+        'index': index,
+        'video_path': video_path,
+        'video_filename': vid_base,
+        'sound_video_paths': sound_video_paths,
+        'success': True
+    }
 
-def main():
+
+def generate_batch_videos(images: List[str], prompts: List[Optional[str]], output_dir: str) -> List[Dict[str, Any]]:
+    """Generate videos for all images in a single upstream request."""
+    system_prompt = "smooth animation, natural movement, facial reactions and actions only, NO Lip movement, high quality"
+    output_paths = [os.path.join(output_dir, f"video_{i+1:02d}.mp4") for i in range(len(images))]
+    full_prompts = [f"{system_prompt}, {p}" if p else system_prompt for p in prompts]
+
+    raw_results = generate_videos_from_images(
+        images, output_paths, full_prompts, duration=5, session=_SESSION
+    )
+
+    results = []
+    for i, raw in enumerate(raw_results):
+        img_base = os.path.basename(images[i])
+        if 'error' in raw:
+            print(f"❌ Video {i + 1} failed: {img_base} - {raw['error']}")
+            results.append({
+                'index': i,
+                'image_path': images[i],
+                'image_filename': img_base,
+                'success': False,
+                'error': raw['error']
+            })
+        else:
+            print(f"✅ Video {i + 1} completed: {os.path.basename(output_paths[i])}")
+            results.append({
+                'index': i,
+                'image_path': images[i],
+                'image_filename': img_base,
+                'video_path': output_paths[i],
+                'video_url': raw['videoURL'],
+                'success': True
+            })
+    return results
+
+
+async def main():
     """Main execution with parallel processing."""
     parser = argparse.ArgumentParser(
         description="Generate videos from multiple images with parallel processing",
@@ -117,8 +218,8 @@ Examples:
     parser.add_argument("images", nargs="+", help="Paths to input PNG images")
     parser.add_argument("--output-dir", "-o", default="./output",
                        help="Output directory for generated videos (default: ./output)")
-    parser.add_argument("--max-workers", "-w", type=int, default=3,
-                       help="Maximum number of parallel workers (default: 3)")
+    parser.add_argument("--max-workers", "-w", type=int, default=DEFAULT_WORKERS,
+                       help=f"Maximum number of parallel workers (default: {DEFAULT_WORKERS}, override via KAI_WORKERS)")
     parser.add_argument("--skip-sound", action="store_true",
                        help="Skip sound generation, only generate videos")
     parser.add_argument("--prompts", nargs="*", default=[],
@@ -126,6 +227,14 @@ Examples:
 
     args = parser.parse_args()
 
+    # asyncio.to_thread runs on the loop's default executor, which caps
+    # out at min(32, cores + 4) threads — far below --max-workers on
+    # small hosts. Size it to match, so the semaphores below are the
+    # binding limit rather than a hidden thread pool.
+    asyncio.get_running_loop().set_default_executor(
+        concurrent.futures.ThreadPoolExecutor(max_workers=args.max_workers)
+    )
+
     print("🎬 Parallel Video Generation Pipeline")
     print("=" * 50)
     print(f"📁 Output directory: {args.output_dir}")
@@ -161,25 +270,59 @@ Examples:
     image_prompts = args.prompts + [None] * (len(valid_images) - len(args.prompts))
     image_prompts = image_prompts[:len(valid_images)]  # Trim if too many prompts
     
-    # Phase 1: Parallel video generation
-    print("🎬 Phase 1: Generating videos from images...")
-    print("-" * 50)
-
-    video_results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=args.max_workers) as executor:
-        # Submit all video generation tasks
-        future_to_index = {
-            executor.submit(generate_video_for_image, img_path, i, args.output_dir, image_prompts[i]): i
-            for i, img_path in enumerate(valid_images)
-        }
+    # Everything allocated so far (imports, parser, validated inputs) lives
+    # for the whole run — freeze it so the GC stops rescanning it during
+    # the multi-minute generation phase
+    gc.collect()
+    gc.freeze()
+
+    if os.environ.get('USE_BATCH_API') == '1' and len(valid_images) > 1:
+        # Batch mode: one upstream request carries every image, amortizing
+        # the per-request HTTP fixed costs across the whole batch
+        print("🎬 Submitting all images in one batch request (USE_BATCH_API=1)...")
+        print("-" * 50)
 
-        # Collect results as they complete
-        for future in concurrent.futures.as_completed(future_to_index):
-            result = future.result()
-            video_results.append(result)
+        sound_semaphore = asyncio.Semaphore(args.max_workers)
+        video_results = await asyncio.to_thread(
+            generate_batch_videos, valid_images, image_prompts, args.output_dir
+        )
+        sound_results = []
+        if not args.skip_sound:
+            sound_results = list(await asyncio.gather(*(
+                generate_sound_for_video_result(r, args.output_dir, sound_semaphore)
+                for r in video_results if r['success']
+            )))
+    else:
+        # Streaming pipeline: sound generation for each clip starts the moment
+        # its video finishes, instead of waiting for every video first.
+        print("🎬 Generating videos (sound starts per clip as each video finishes)...")
+        print("-" * 50)
 
-    # Sort results by index
-    video_results.sort(key=lambda x: x['index'])
+        # Concurrency is capped by semaphores instead of thread pool sizes
+        video_semaphore = asyncio.Semaphore(args.max_workers)
+        sound_semaphore = asyncio.Semaphore(args.max_workers)
+
+        async def process_image_pipeline(img_path: str, i: int) -> tuple:
+            """Video then (optionally) sound for one image, back to back."""
+            video_result = await generate_video_for_image(
+                img_path, i, args.output_dir, video_semaphore, image_prompts[i]
+            )
+            if args.skip_sound or not video_result['success']:
+                return video_result, None
+            sound_result = await generate_sound_for_video_result(
+                video_result, args.output_dir, sound_semaphore
+            )
+            return video_result, sound_result
+
+        pipeline_results = await asyncio.gather(*(
+            process_image_pipeline(img_path, i)
+            for i, img_path in enumerate(valid_images)
+        ))
+
+        # gather returns results in submission order, so both lists are already
+        # index-ordered — no O(N log N) sort pass needed
+        video_results = [video for video, _ in pipeline_results]
+        sound_results = [sound for _, sound in pipeline_results if sound is not None]
 
     # Filter successful results
     successful_videos = [r for r in video_results if r['success']]
@@ -192,7 +335,7 @@ Examples:
     if failed_videos:
         print("   Failed images:")
         for failure in failed_videos:
-            print(f"     - {os.path.basename(failure['image_path'])}: {failure['error']}")
+            print(f"     - {failure['image_filename']}: {failure['error']}")
 
     print()
 
@@ -200,27 +343,8 @@ Examples:
         print("❌ No videos were generated successfully!")
         return
 
-    # Phase 2: Parallel sound generation (if not skipped)
+    # Sound results were produced inside the pipeline (if not skipped)
     if not args.skip_sound:
-        print("🎵 Phase 2: Adding sound effects...")
-        print("-" * 50)
-
-        sound_results = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=min(args.max_workers, len(successful_videos))) as executor:
-            # Submit all sound generation tasks
-            future_to_video = {
-                executor.submit(generate_sound_for_video_result, video_result, args.output_dir): video_result
-                for video_result in successful_videos
-            }
-
-            # Collect results as they complete
-            for future in concurrent.futures.as_completed(future_to_video):
-                result = future.result()
-                sound_results.append(result)
-
-        # Sort results by index
-        sound_results.sort(key=lambda x: x['index'])
-
         # Filter successful results
         successful_sounds = [r for r in sound_results if r['success']]
         failed_sounds = [r for r in sound_results if not r['success']]
@@ -232,7 +356,7 @@ Examples:
         if failed_sounds:
             print("   Failed videos:")
             for failure in failed_sounds:
-                print(f"     - {os.path.basename(failure['video_path'])}: {failure['error']}")
+                print(f"     - {failure['video_filename']}: {failure['error']}")
 
         print()
 
@@ -251,10 +375,12 @@ Examples:
     # List generated files
     print(f"\n📋 Generated files:")
     try:
-        files = sorted(os.listdir(args.output_dir))
-        video_files = [f for f in files if f.endswith('.mp4')]
-        for file in video_files:
-            print(f"   📁 {file}")
+        # scandir avoids building an all-filenames list; DirEntry.is_file()
+        # reuses the cached stat from the directory read
+        with os.scandir(args.output_dir) as it:
+            for entry in sorted((e for e in it if e.is_file() and e.name.endswith('.mp4')),
+                                key=lambda e: e.name):
+                print(f"   📁 {entry.name}")
     except Exception as e:
         print(f"   ⚠️  Could not list files: {e}")
 
@@ -262,4 +388,4 @@ Examples:
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
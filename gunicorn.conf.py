@@ -0,0 +1,16 @@
+"""Gunicorn configuration for the video generation API.
+
+Requests stay open while videos render, so the worker timeout and
+keepalive are set far above the defaults. Threaded workers fit the
+workload: handlers spend nearly all their time waiting on upstream
+APIs, not the CPU.
+"""
+
+import os
+
+bind = "0.0.0.0:8080"
+worker_class = "gthread"
+workers = max(2, os.cpu_count() or 1)
+threads = 8
+timeout = 600  # video generation can take minutes
+keepalive = 30
@@ -6,136 +6,145 @@ A Flask-based REST API for processing images into videos with optional sound.
 Supports file uploads and custom prompts for each image.
 """
 
+import atexit
+import gc
+import hashlib
+import io
+import logging
 import os
-import sys
+import shutil
 import tempfile
+import threading
 import uuid
-from pathlib import Path
-from typing import List, Dict, Any, Optional
-from flask import Flask, request, jsonify, send_file, render_template_string
+from flask import Flask, Request, Response, request, jsonify, send_file
+from flask_compress import Compress
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-import concurrent.futures
 
-# Add the module directories to Python path
-sys.path.append(str(Path(__file__).parent / "videogeneration"))
-sys.path.append(str(Path(__file__).parent / "soundgeneration"))
-
-from videogeneration import generate_video_from_image
-from soundgeneration import generate_sound_for_video
+from worker import run_pipeline
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend
+# Transparent br/gzip compression (negotiated via Accept-Encoding) — the
+# video_results JSON payload is several KB per image and compresses well
+app.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html', 'text/css', 'application/javascript']
+app.config['COMPRESS_LEVEL'] = 6
+app.config['COMPRESS_MIN_SIZE'] = 500
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']  # prefer brotli
+Compress(app)
+app.logger.setLevel(logging.WARNING)  # debug diagnostics are opt-in
 
 # Configuration
-UPLOAD_FOLDER = os.path.abspath('uploads')
+# Keep uploads on RAM-backed tmpfs when available: each image is only read
+# back once for encoding, so there is no reason to round-trip it via disk.
+if os.path.isdir('/dev/shm'):
+    UPLOAD_FOLDER = tempfile.mkdtemp(dir='/dev/shm', prefix='kai_up_')
+    atexit.register(shutil.rmtree, UPLOAD_FOLDER, ignore_errors=True)
+else:
+    UPLOAD_FOLDER = os.path.abspath('uploads')
 OUTPUT_FOLDER = os.path.abspath('output')
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
+ALLOWED_EXTENSIONS = frozenset(('png', 'jpg', 'jpeg', 'webp'))
 
+# Handlers read the module globals directly; app.config mirrors them only
+# for anything external that introspects the app
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
+app.config['MAX_FORM_MEMORY_SIZE'] = 2 * 1024 * 1024  # spool larger multipart parts to disk
+# When fronted by nginx with an X-Accel/X-Sendfile location for the output
+# folder, let it serve the video bytes instead of pumping them through Python
+app.use_x_sendfile = bool(os.environ.get('USE_X_SENDFILE'))
 
 # Create directories
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-def allowed_file(filename):
-    """Check if file extension is allowed."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def process_single_image(image_path: str, index: int, output_dir: str, custom_prompt: Optional[str] = None) -> Dict[str, Any]:
-    """Process a single image into video (same as example_usage.py)."""
-    try:
-        output_filename = f"video_{index+1:02d}.mp4"
-        output_path = os.path.join(output_dir, output_filename)
-
-        print(f"🎬 Generating video {index + 1} from: {os.path.basename(image_path)}")
-        print(f"   📁 Full image path: {image_path}")
-        print(f"   📁 Output path: {output_path}")
-        print(f"   📏 File exists: {os.path.exists(image_path)}")
-        if os.path.exists(image_path):
-            print(f"   📊 File size: {os.path.getsize(image_path)} bytes")
-
-        # Combine system prompt with custom prompt if provided
-        system_prompt = "smooth animation, natural movement, facial reactions and actions only, NO Lip movement, high quality"
-        if custom_prompt:
-            positive_prompt = f"{system_prompt}, {custom_prompt}"
-            print(f"   📝 Using custom prompt: {custom_prompt}")
-        else:
-            positive_prompt = system_prompt
-
-        print(f"   🤖 Using model: bytedance:1@1")
-        result = generate_video_from_image(
-            image_path=image_path,
-            output_path=output_path,
-            positive_prompt=positive_prompt,
-            duration=5,
-            model="bytedance:1@1",
-            width=1248,
-            height=704,
-            fps=24
-        )
-        
-        print(f"✅ Video {index + 1} completed: {os.path.basename(output_path)}")
-        return {
-            'index': index,
-            'image_filename': os.path.basename(image_path),
-            'video_filename': output_filename,
-            'video_path': output_path,
-            'video_url': result['videoURL'],
-            'model_used': "bytedance:1@1",
-            'success': True
-        }
-
-    except Exception as e:
-        print(f"❌ Video {index + 1} failed: {os.path.basename(image_path)} - {e}")
-        return {
-            'index': index,
-            'image_filename': os.path.basename(image_path),
-            'success': False,
-            'error': str(e)
-        }
+class _SpoolingRequest(Request):
+    """Request class whose multipart file parts spool to the upload folder.
 
-def process_single_sound(video_result: Dict[str, Any], output_dir: str) -> Dict[str, Any]:
-    """Add sound to a single video."""
-    try:
-        index = video_result['index']
-        video_path = video_result['video_path']
-
-        print(f"🎵 Adding sound to video {index + 1}: {os.path.basename(video_path)}")
-
-        sound_video_paths = generate_sound_for_video(
-            video_source=video_path,  # Use local file (no re-download)
-            output_dir=output_dir,
-            output_prefix=f"sound_video_{index+1:02d}",
-            text_prompt="cinematic sound effects, ambient sounds, facial reactions, actions",
-            negative_prompt="speech, talking, dialogue, vocals, words",
-            duration=5,
-            creativity_coef=6
-        )
-
-        print(f"✅ Sound {index + 1} completed: {len(sound_video_paths)} file(s)")
-        return {
-            'index': index,
-            'video_path': video_path,
-            'sound_video_paths': sound_video_paths,
-            'success': True
-        }
+    Small parts stay in memory; anything past 8MB lands in a
+    SpooledTemporaryFile under UPLOAD_FOLDER (tmpfs when available)
+    instead of growing fresh heap allocations per upload.
+    """
 
-    except Exception as e:
-        print(f"❌ Sound {index + 1} failed: {os.path.basename(video_result['video_path'])} - {e}")
-        return {
-            'index': index,
-            'video_path': video_result['video_path'],
-            'success': False,
-            'error': str(e)
-        }
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024, mode='rb+', dir=UPLOAD_FOLDER)
+
+app.request_class = _SpoolingRequest
+
+# One reusable 1MiB copy buffer per worker thread, so upload saves don't
+# allocate a fresh bytes object per chunk
+_THREAD_LOCAL = threading.local()
+
+def _copy_buffer() -> bytearray:
+    if not hasattr(_THREAD_LOCAL, 'buf'):
+        _THREAD_LOCAL.buf = bytearray(1024 * 1024)
+    return _THREAD_LOCAL.buf
+
+# Optional job queue: when Redis is reachable, POST /api/generate-videos
+# enqueues the pipeline and returns a job id immediately instead of holding
+# the HTTP worker for minutes. Start workers with:
+#     rq worker --url $REDIS_URL kindergarten
+# Without Redis the pipeline runs inline, as before.
+try:
+    from redis import Redis
+    from rq import Queue
+    _redis = Redis.from_url(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+    _redis.ping()
+    JOB_QUEUE = Queue('kindergarten', connection=_redis)
+except Exception:
+    JOB_QUEUE = None
+
+def allowed_file(filename: str) -> bool:
+    """Check if file extension is allowed."""
+    # rpartition scans the name once and never raises on dotless names
+    head, dot, ext = filename.rpartition('.')
+    return bool(dot) and ext.lower() in ALLOWED_EXTENSIONS
+
+def save_upload(file, file_path: str) -> None:
+    """Save an uploaded file using large copies instead of file.save's 16KB chunks."""
+    stream = file.stream
+    with open(file_path, 'wb', buffering=0) as dst:
+        # Only sendfile when the spool has already rolled over to a real
+        # file: calling fileno() on an in-memory SpooledTemporaryFile
+        # forces a rollover, which would turn the common small-upload
+        # case into a disk write plus a disk-to-disk copy
+        if hasattr(os, 'sendfile') and getattr(stream, '_rolled', True):
+            # Zero-copy path: let the kernel move the bytes directly.
+            # Size comes from fstat of the spooled stream — the per-part
+            # Content-Length header is client-supplied and can lie — and
+            # sendfile may transfer less than asked, so loop until done.
+            try:
+                count = os.fstat(stream.fileno()).st_size
+                offset = 0
+                while offset < count:
+                    sent = os.sendfile(dst.fileno(), stream.fileno(), offset, count - offset)
+                    if sent == 0:
+                        raise OSError("sendfile returned 0 before EOF")
+                    offset += sent
+                return
+            except (AttributeError, OSError, io.UnsupportedOperation):
+                # Stream is in-memory or sendfile unsupported: drop any
+                # partial copy and redo the whole file through userspace
+                dst.seek(0)
+                dst.truncate()
+                stream.seek(0)
+        if hasattr(stream, 'readinto'):
+            # readinto fills the reused thread-local buffer in place instead
+            # of allocating a new bytes object per chunk
+            buf = _copy_buffer()
+            view = memoryview(buf)
+            while True:
+                n = stream.readinto(buf)
+                if not n:
+                    break
+                dst.write(view[:n])
+        else:
+            shutil.copyfileobj(stream, dst, length=1024 * 1024)
 
-@app.route('/')
-def index():
-    """Serve the main HTML page."""
-    html = """
+# The page is fully static, so render it once at import time instead of
+# pushing it through render_template_string on every GET
+INDEX_HTML = """
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -281,7 +290,11 @@ def index():
 
                 const result = await response.json();
 
-                if (response.ok) {
+                if (response.status === 202) {
+                    // Queued: poll the job endpoint until it finishes
+                    status.textContent = `Queued as job ${result.job_id}...`;
+                    displayResults(await pollJob(result.job_id));
+                } else if (response.ok) {
                     displayResults(result);
                 } else {
                     throw new Error(result.error || 'Processing failed');
@@ -294,6 +307,18 @@ def index():
             }
         });
 
+        async function pollJob(jobId) {
+            while (true) {
+                await new Promise(resolve => setTimeout(resolve, 3000));
+                const res = await fetch(`/api/jobs/${jobId}`);
+                const data = await res.json();
+                if (!res.ok) throw new Error(data.error || 'Job lookup failed');
+                if (data.status === 'finished') return data.result;
+                if (data.status === 'failed') throw new Error(data.error || 'Job failed');
+                status.textContent = `Job ${jobId}: ${data.status}...`;
+            }
+        }
+
         function displayResults(data) {
             let html = '<h3>🎉 Processing Complete!</h3>';
 
@@ -303,7 +328,7 @@ def index():
                     if (result.success) {
                         html += `
                             <div class="result success">
-                                ✅ ${result.image_filename} → ${result.video_filename}<br>
+                                ✅ ${result.image_filename} → ${result.video_filename || 'ready (CDN)'}<br>
                                 <a href="${result.video_url}" target="_blank">📺 View Video</a>
                             </div>
                         `;
@@ -330,8 +355,17 @@ def index():
     </script>
 </body>
 </html>
-    """
-    return render_template_string(html)
+"""
+_INDEX_ETAG = hashlib.md5(INDEX_HTML.encode()).hexdigest()
+
+@app.route('/')
+def index():
+    """Serve the main HTML page (pre-rendered, with ETag/304 support)."""
+    response = Response(INDEX_HTML, mimetype='text/html')
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    response.set_etag(_INDEX_ETAG)
+    # Returns 304 without the body when If-None-Match hits
+    return response.make_conditional(request)
 
 @app.route('/api/generate-videos', methods=['POST'])
 def generate_videos():
@@ -348,88 +382,97 @@ def generate_videos():
         if not files or all(file.filename == '' for file in files):
             return jsonify({'error': 'No files selected'}), 400
 
-        # Validate and save uploaded files
-        uploaded_files = []
-        for file in files:
-            if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                unique_filename = f"{uuid.uuid4()}_{filename}"
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-                file.save(file_path)
-                uploaded_files.append(file_path)
-            else:
-                return jsonify({'error': f'Invalid file type: {file.filename}'}), 400
-
-        # Create prompt list matching number of images
-        image_prompts = prompts + [None] * (len(uploaded_files) - len(prompts))
-        image_prompts = image_prompts[:len(uploaded_files)]
-
-        # Phase 1: Generate videos in parallel
-        video_results = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=min(3, len(uploaded_files))) as executor:
-            future_to_index = {
-                executor.submit(process_single_image, img_path, i, app.config['OUTPUT_FOLDER'], image_prompts[i]): i
-                for i, img_path in enumerate(uploaded_files)
-            }
-
-            for future in concurrent.futures.as_completed(future_to_index):
-                result = future.result()
-                video_results.append(result)
-
-        # Sort results by index
-        video_results.sort(key=lambda x: x['index'])
-
-        # Filter successful results
-        successful_videos = [r for r in video_results if r['success']]
-
-        response_data = {
-            'video_results': video_results,
-            'successful_videos': len(successful_videos),
-            'total_videos': len(video_results)
-        }
-
-        # Phase 2: Add sound if requested
-        if add_sound and successful_videos:
-            sound_results = []
-            with concurrent.futures.ThreadPoolExecutor(max_workers=min(3, len(successful_videos))) as executor:
-                future_to_video = {
-                    executor.submit(process_single_sound, video_result, app.config['OUTPUT_FOLDER']): video_result
-                    for video_result in successful_videos
-                }
-
-                for future in concurrent.futures.as_completed(future_to_video):
-                    result = future.result()
-                    sound_results.append(result)
-
-            # Sort results by index
-            sound_results.sort(key=lambda x: x['index'])
+        # All uploads for one request live in a single transient directory.
+        # We own it until the pipeline (or the queue worker) takes over;
+        # every exit before that handoff — early 400s included — must
+        # remove it, or rejected uploads pile up on tmpfs
+        request_dir = tempfile.mkdtemp(dir=UPLOAD_FOLDER, prefix='req_')
+        owns_dir = True
+        try:
+            # Validate and save uploaded files
+            uploaded_files = []
+            for file in files:
+                if file and allowed_file(file.filename):
+                    filename = secure_filename(file.filename)
+                    unique_filename = f"{uuid.uuid4()}_{filename}"
+                    file_path = os.path.join(request_dir, unique_filename)
+                    save_upload(file, file_path)
+                    uploaded_files.append(file_path)
+                else:
+                    return jsonify({'error': f'Invalid file type: {file.filename}'}), 400
+
+            # Create prompt list matching number of images
+            image_prompts = prompts + [None] * (len(uploaded_files) - len(prompts))
+            image_prompts = image_prompts[:len(uploaded_files)]
+
+            if JOB_QUEUE is not None:
+                # Hand off to a background worker and answer immediately
+                job = JOB_QUEUE.enqueue(
+                    run_pipeline, uploaded_files, image_prompts, add_sound,
+                    OUTPUT_FOLDER, request_dir, job_timeout=1800
+                )
+                owns_dir = False  # the worker removes request_dir when done
+                return jsonify({'job_id': job.id}), 202
+
+            # No queue configured: run the pipeline inline (blocks this
+            # worker); run_pipeline removes request_dir in its finally
+            owns_dir = False
+            return jsonify(run_pipeline(
+                uploaded_files, image_prompts, add_sound,
+                OUTPUT_FOLDER, request_dir
+            ))
+        finally:
+            if owns_dir:
+                shutil.rmtree(request_dir, ignore_errors=True)
 
-            response_data['sound_results'] = sound_results
-            response_data['successful_sounds'] = len([r for r in sound_results if r['success']])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        # Clean up uploaded files
-        for file_path in uploaded_files:
-            try:
-                os.remove(file_path)
-            except:
-                pass  # Ignore cleanup errors
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Poll the status/result of a queued generation job."""
+    if JOB_QUEUE is None:
+        return jsonify({'error': 'Job queue not configured'}), 503
 
-        return jsonify(response_data)
+    from rq.job import Job
+    try:
+        job = Job.fetch(job_id, connection=JOB_QUEUE.connection)
+    except Exception:
+        return jsonify({'error': 'Job not found'}), 404
 
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    payload = {'job_id': job_id, 'status': job.get_status()}
+    if job.is_finished:
+        payload['result'] = job.result
+    elif job.is_failed:
+        payload['error'] = 'Job failed'
+    return jsonify(payload)
 
 @app.route('/api/download/<filename>')
 def download_file(filename):
     """Serve generated video files for download."""
-    file_path = os.path.join(app.config['OUTPUT_FOLDER'], filename)
-    if os.path.exists(file_path):
-        return send_file(file_path, as_attachment=True)
-    else:
+    filename = secure_filename(filename)  # prevent path traversal
+    file_path = os.path.join(OUTPUT_FOLDER, filename)
+    if not os.path.isfile(file_path):
         return jsonify({'error': 'File not found'}), 404
+    # conditional=True honors Range/If-Modified-Since so players can seek
+    # without re-downloading the whole MP4
+    return send_file(file_path, as_attachment=True, conditional=True, max_age=3600)
+
+# Startup objects (Flask, routes, the worker pools and session) are
+# long-lived: move them to the permanent generation so the GC stops
+# rescanning them, and collect far less often — long generation runs
+# otherwise accumulate collection pauses for zero reclaimed memory
+gc.collect()
+gc.freeze()
+gc.set_threshold(100_000, 20, 20)
 
 if __name__ == '__main__':
-    print("🎬 Video Generation API Server")
-    print("📡 Starting server on http://localhost:8080")
-    print("🌐 Open your browser to upload images and generate videos!")
-    app.run(debug=True, host='0.0.0.0', port=8080)
\ No newline at end of file
+    if os.environ.get('FLASK_DEV'):
+        print("🎬 Video Generation API Server (development mode)")
+        print("📡 Starting server on http://localhost:8080")
+        print("🌐 Open your browser to upload images and generate videos!")
+        app.run(debug=True, host='0.0.0.0', port=8080)
+    else:
+        print("🎬 Video Generation API Server")
+        print("🚀 For production use: gunicorn -c gunicorn.conf.py wsgi:app")
+        print("🔧 Or set FLASK_DEV=1 to run the Werkzeug development server")
\ No newline at end of file
@@ -6,17 +6,140 @@ This module provides functionality to add sound effects to videos using the Mire
 It can process videos from URLs and generate synchronized audio tracks.
 """
 
+import asyncio
+import hashlib
+import json
 import os
+import sqlite3
 import sys
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
 from pathlib import Path
 from typing import List, Optional
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 from video_input import download_video
 
 # Load environment variables from .env
 load_dotenv()
 
+# Resolved once at import: per-call os.getenv / Path construction is
+# wasted work when the module is driven in a hot loop, and a fixed key
+# avoids surprises if the environment changes mid-run
+_DEFAULT_API_KEY = os.getenv("MIRELO_API_KEY")
+_DEFAULT_OUTPUT = Path("./output")
+
+
+@cache
+def _ensure_dir(path: Path) -> Path:
+    """mkdir -p once per distinct output directory per process."""
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _file_hash(path: str) -> str:
+    """BLAKE2b digest of a file's contents, streamed in 1MB blocks."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+# Mirelo output URLs are signed and expire, so cached rows older than
+# this are treated as misses
+_GEN_CACHE_TTL = 6 * 3600
+
+
+def _gen_cache(output_dir: Path) -> sqlite3.Connection:
+    """Open (and initialize) the per-output-dir generation cache."""
+    conn = sqlite3.connect(output_dir / "_mirelo_cache.db")
+    conn.execute("CREATE TABLE IF NOT EXISTS gen (key TEXT PRIMARY KEY, urls TEXT, ts REAL)")
+    return conn
+
+# Module-level session: create-asset, upload, sfx and downloads all reuse
+# the same keep-alive connection pool instead of paying a TCP+TLS
+# handshake per call (3+N round trips per run)
+# Retries with exponential backoff turn transient blips (and 429
+# throttling) into short auto-recoveries instead of failed pipelines;
+# PUT/POST are safe to retry here — asset upload and sfx are idempotent
+# per asset id. The policy constants are shared with the HTTP/2 path in
+# _post_json so recovery doesn't depend on which client a call lands on.
+_RETRY_TOTAL = 5
+_RETRY_BACKOFF = 0.5
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_SESSION = requests.Session()
+_SESSION.mount('https://', requests.adapters.HTTPAdapter(
+    pool_connections=10, pool_maxsize=20,
+    max_retries=Retry(
+        total=_RETRY_TOTAL, backoff_factor=_RETRY_BACKOFF,
+        status_forcelist=_RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "PUT", "POST"})
+    )
+))
+
+# (connect, read) timeouts so a dropped packet can't stall a job forever
+_TIMEOUT = (5, 60)
+
+# orjson (C, SIMD) makes encode/decode of API bodies near-free; fall back
+# to stdlib json when it is not installed
+try:
+    import orjson
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    _json_loads = json.loads
+
+
+def _post_json(url: str, payload: dict, headers: dict, timeout=_TIMEOUT, http=_SESSION):
+    """POST a pre-encoded JSON body, over HTTP/2 when available.
+
+    A caller-injected session always wins over the shared HTTP/2 client
+    (its pool and retries were configured deliberately), and the
+    (connect, read) timeout is honored on both paths — the slow
+    video-to-sfx call depends on its 300s read window.
+    """
+    headers = {**headers, "Content-Type": "application/json"}
+    body = _json_dumps(payload)
+    if _HTTP2_CLIENT is not None and http is _SESSION:
+        # httpx transports only retry connect failures, so mirror the
+        # session's status-based Retry policy here — 429/5xx recovery
+        # must not disappear just because the optional client is in use
+        for attempt in range(_RETRY_TOTAL + 1):
+            response = _HTTP2_CLIENT.post(
+                url, headers=headers, content=body,
+                timeout=httpx.Timeout(timeout[0], read=timeout[1])
+            )
+            if response.status_code not in _RETRY_STATUSES or attempt == _RETRY_TOTAL:
+                return response
+            time.sleep(_RETRY_BACKOFF * (2 ** attempt))
+    return http.post(url, headers=headers, data=body, timeout=timeout)
+
+# Optional HTTP/2 client for the small JSON control calls (create-asset,
+# video-to-sfx): all traffic hits api.mirelo.ai, so h2 multiplexes them
+# over one TLS connection with HPACK header compression. Streamed
+# uploads/downloads stay on the requests session.
+try:
+    import httpx
+    _HTTP2_CLIENT = httpx.Client(
+        timeout=60,
+        transport=httpx.HTTPTransport(
+            http2=True, retries=_RETRY_TOTAL,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10)
+        )
+    )
+except ImportError:
+    _HTTP2_CLIENT = None
+
 
 def generate_sound_for_video(
     video_source: str,
@@ -29,7 +152,8 @@ def generate_sound_for_video(
     creativity_coef: int = 5,
     text_prompt: str = "cinematic sound effects, ambient sounds, facial reactions, actions",
     negative_prompt: str = "speech, talking, dialogue, vocals, words",
-    steps: int = 25
+    steps: int = 25,
+    session: Optional[requests.Session] = None
 ) -> List[str]:
     """
     Generate sound effects for a video from URL or local file using Mirelo API.
@@ -40,12 +164,16 @@ def generate_sound_for_video(
         output_prefix: Prefix for output filenames (optional, defaults to "result_video")
         api_key: Mirelo API key (if not provided, uses MIRELO_API_KEY env var)
         duration: Duration to process in seconds (max 10)
-        num_samples: Number of audio tracks to generate
+        num_samples: Number of audio tracks to generate. Prefer this over
+            calling the function K times for K variants: one upload and
+            one generate call feed all samples, and the results download
+            concurrently — K separate runs pay K uploads and handshakes
         model_version: Model version to use
         creativity_coef: Creativity level (1-10)
         text_prompt: Text guidance for sound generation
         negative_prompt: What to avoid in sound generation
         steps: Generation quality (higher = better quality, slower)
+        session: Optional requests.Session to reuse connections across calls
         
     Returns:
         List of paths to generated video files with sound
@@ -54,25 +182,39 @@ def generate_sound_for_video(
         ValueError: If API key is missing
         Exception: If processing fails
     """
-    # Get API key from parameter or environment
-    api_key = api_key or os.getenv("MIRELO_API_KEY")
+    # Get API key from parameter or environment (resolved at import)
+    api_key = api_key or _DEFAULT_API_KEY
     if not api_key:
         raise ValueError("API key required. Set MIRELO_API_KEY environment variable or pass api_key parameter")
-    
+
+    # Fail fast on cheap checks before any network I/O: a bad parameter
+    # rejected only after download+upload wastes bandwidth and quota
+    if not 1 <= duration <= 10:
+        raise ValueError(f"duration must be between 1 and 10 seconds, got {duration}")
+    if not 1 <= creativity_coef <= 10:
+        raise ValueError(f"creativity_coef must be between 1 and 10, got {creativity_coef}")
+    if num_samples < 1:
+        raise ValueError(f"num_samples must be at least 1, got {num_samples}")
+    if steps < 1:
+        raise ValueError(f"steps must be at least 1, got {steps}")
+
+    # Reuse the caller's session when provided, else the module pool
+    http = session or _SESSION
+
     # Set up output directory
     if output_dir:
         output_path = Path(output_dir)
     else:
-        output_path = Path("./output")  # Default to ./output instead of temp dir
-    
-    output_path.mkdir(parents=True, exist_ok=True)
+        output_path = _DEFAULT_OUTPUT  # Default to ./output instead of temp dir
+
+    _ensure_dir(output_path)
     
     # Determine if video_source is a URL or local file
     if video_source.startswith(('http://', 'https://')):
         # It's a URL - download it
         input_video_path = output_path / "input_video.mp4"
         print(f"📥 Downloading video from: {video_source}")
-        download_video(video_source, str(input_video_path))
+        download_video(video_source, str(input_video_path), session=session)
         should_cleanup_input = False  # Don't cleanup downloaded files in output dir
     else:
         # It's a local file path
@@ -83,20 +225,63 @@ def generate_sound_for_video(
         should_cleanup_input = False  # Don't cleanup local files
     
     try:
-        # Upload video and get asset ID
-        customer_asset_id = _upload_video(str(input_video_path), api_key)
-        
-        # Generate SFX
-        output_urls = _generate_sfx(
-            customer_asset_id, api_key, duration, num_samples, model_version,
-            creativity_coef, text_prompt, negative_prompt, steps
-        )
-        
-        if not output_urls:
-            raise Exception("No output URLs generated")
-        
+        content_hash = _file_hash(str(input_video_path))
+
+        # Durable (hash, params) -> urls memoization: an identical re-run
+        # (the usual case while debugging a pipeline) skips upload and
+        # generation entirely and goes straight to the downloads
+        params_key = json.dumps({
+            "duration": duration, "num_samples": num_samples,
+            "model_version": model_version, "creativity_coef": creativity_coef,
+            "text_prompt": text_prompt, "negative_prompt": negative_prompt,
+            "steps": steps,
+        }, sort_keys=True)
+        gen_key = hashlib.blake2b((content_hash + params_key).encode(), digest_size=16).hexdigest()
+        conn = _gen_cache(output_path)
+        try:
+            output_urls = None
+            row = conn.execute("SELECT urls, ts FROM gen WHERE key = ?", (gen_key,)).fetchone()
+            if row and time.time() - row[1] < _GEN_CACHE_TTL:
+                output_urls = json.loads(row[0])
+                print(f"♻️  Reusing {len(output_urls)} cached generation URL(s)")
+
+            if output_urls is None:
+                # Upload video and get asset ID — unless this exact file
+                # was uploaded before (parameter sweeps over
+                # creativity/steps being the common case); asset ids are
+                # memoized by content hash in a JSON sidecar
+                cache_file = output_path / "_upload_cache.json"
+                upload_cache = {}
+                if cache_file.exists():
+                    try:
+                        upload_cache = json.loads(cache_file.read_text())
+                    except (ValueError, OSError):
+                        upload_cache = {}
+                customer_asset_id = upload_cache.get(content_hash)
+                if customer_asset_id:
+                    print(f"♻️  Reusing uploaded asset: {customer_asset_id}")
+                else:
+                    customer_asset_id = _upload_video(str(input_video_path), api_key, http)
+                    upload_cache[content_hash] = customer_asset_id
+                    cache_file.write_text(json.dumps(upload_cache))
+
+                # Generate SFX
+                output_urls = _generate_sfx(
+                    customer_asset_id, api_key, duration, num_samples, model_version,
+                    creativity_coef, text_prompt, negative_prompt, steps, http
+                )
+
+                if not output_urls:
+                    raise Exception("No output URLs generated")
+
+                conn.execute("INSERT OR REPLACE INTO gen VALUES (?, ?, ?)",
+                             (gen_key, json.dumps(output_urls), time.time()))
+                conn.commit()
+        finally:
+            conn.close()
+
         # Download results
-        local_paths = _download_results(output_urls, output_path, output_prefix or "result_video")
+        local_paths = _download_results(output_urls, output_path, output_prefix or "result_video", http)
         
         print(f"✅ Sound generation completed! Files saved to: {output_path}")
         return local_paths
@@ -105,7 +290,31 @@ def generate_sound_for_video(
         raise Exception(f"Sound generation failed: {str(e)}")
 
 
-def _upload_video(video_path: str, api_key: str) -> str:
+class _UploadReader:
+    """Sized, seekable file wrapper for streamed PUT bodies.
+
+    Exposing `len` lets requests send a plain Content-Length body (a
+    generator would force Transfer-Encoding: chunked, which presigned
+    upload URLs reject), and delegating seek/tell lets urllib3 rewind
+    the body on a mid-upload retry instead of re-sending nothing. Reads
+    are widened to 1MB so disk I/O still overlaps the socket send.
+    """
+
+    def __init__(self, fileobj, size: int):
+        self._f = fileobj
+        self.len = size
+
+    def read(self, n: int = -1) -> bytes:
+        return self._f.read(-1 if n is None or n < 0 else max(n, 1 << 20))
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._f.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._f.tell()
+
+
+def _upload_video(video_path: str, api_key: str, http=_SESSION) -> str:
     """Upload video and get customer_asset_id"""
     
     print("📤 Uploading video...")
@@ -117,31 +326,32 @@ def _upload_video(video_path: str, api_key: str) -> str:
     
     # Step 1: Create customer asset
     print("   Creating upload URL...")
-    create_response = requests.post(
+    create_response = _post_json(
         f"{BASE_URL}/create-customer-asset",
-        headers={
-            "x-api-key": api_key,
-            "Content-Type": "application/json"
-        },
-        json={"contentType": "video/mp4"}
+        {"contentType": "video/mp4"},
+        {"x-api-key": api_key},
+        http=http
     )
-    
+
     if create_response.status_code != 200:
-        raise Exception(f"Failed to create asset: {create_response.json()}")
-    
-    create_data = create_response.json()
+        raise Exception(f"Failed to create asset: {_json_loads(create_response.content)}")
+
+    create_data = _json_loads(create_response.content)
     customer_asset_id = create_data["customer_asset_id"]
     upload_url = create_data["upload_url"]
     
     print(f"   ✅ Customer Asset ID: {customer_asset_id}")
     
-    # Step 2: Upload video file
+    # Step 2: Upload video file, streamed 1MB at a time with a sized and
+    # rewindable body — see _UploadReader for why a generator won't do
     print(f"   Uploading {video_path}...")
+
     with open(video_path, "rb") as video_file:
-        upload_response = requests.put(
+        upload_response = http.put(
             upload_url,
-            data=video_file,
-            headers={"Content-Type": "video/mp4"}
+            data=_UploadReader(video_file, os.path.getsize(video_path)),
+            headers={"Content-Type": "video/mp4"},
+            timeout=_TIMEOUT
         )
     
     if upload_response.status_code not in [200, 204]:
@@ -155,7 +365,7 @@ def _upload_video(video_path: str, api_key: str) -> str:
 def _generate_sfx(
     customer_asset_id: str, api_key: str, duration: int, num_samples: int,
     model_version: str, creativity_coef: int, text_prompt: str,
-    negative_prompt: str, steps: int
+    negative_prompt: str, steps: int, http=_SESSION
 ) -> List[str]:
     """Generate SFX for the uploaded video"""
     
@@ -182,22 +392,22 @@ def _generate_sfx(
     print(f"📝 Text guidance: {payload['text_prompt']}")
     print(f"🚫 Negative prompt: {payload['negative_prompt']}")
     
-    # Make API request
-    response = requests.post(
+    # Make API request; generation itself is the slow call, so allow a
+    # longer read window
+    response = _post_json(
         f"{BASE_URL}/video-to-sfx",
-        headers={
-            "x-api-key": api_key,
-            "Content-Type": "application/json"
-        },
-        json=payload
+        payload,
+        {"x-api-key": api_key},
+        timeout=(5, 300),
+        http=http
     )
-    
+
     if response.status_code != 201:
         print(f"❌ Error: {response.status_code}")
-        print(response.json())
+        print(_json_loads(response.content))
         return []
-    
-    result = response.json()
+
+    result = _json_loads(response.content)
     output_urls = result.get("output_paths", [])
     
     print(f"✅ Generated {len(output_urls)} output file(s)")
@@ -205,25 +415,119 @@ def _generate_sfx(
     return output_urls
 
 
-def _download_results(output_urls: List[str], output_dir: Path, filename_prefix: str = "result_video") -> List[str]:
-    """Download the generated video files"""
-    
-    print("📥 Downloading results...")
-    
-    local_paths = []
-    for idx, video_url in enumerate(output_urls, 1):
-        print(f"   Downloading result {idx}...")
-        
-        video_response = requests.get(video_url)
-        if video_response.status_code == 200:
-            output_path = output_dir / f"{filename_prefix}_{idx}.mp4"
-            output_path.write_bytes(video_response.content)
-            local_paths.append(str(output_path))
-            print(f"   ✅ Saved to: {output_path}")
-        else:
+def _download_one(video_url: str, output_path: Path, http=_SESSION) -> Optional[str]:
+    """Download a single result video; returns the local path or None."""
+    # Stream in 1MB chunks so peak memory stays ~1MB instead of the full
+    # MP4 being held as a bytes object before the write
+    with http.get(video_url, stream=True, timeout=_TIMEOUT) as video_response:
+        if video_response.status_code != 200:
             print(f"   ❌ Failed to download: {video_response.status_code}")
-    
-    return local_paths
+            return None
+        with open(output_path, 'wb') as f:
+            for chunk in video_response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+    print(f"   ✅ Saved to: {output_path}")
+    return str(output_path)
+
+
+def _download_results(output_urls: List[str], output_dir: Path, filename_prefix: str = "result_video", http=_SESSION) -> List[str]:
+    """Download the generated video files concurrently.
+
+    With num_samples > 1 the results download in parallel over the shared
+    connection pool, so wall time is ~one download instead of their sum.
+    """
+    print(f"📥 Downloading {len(output_urls)} result(s)...")
+
+    with ThreadPoolExecutor(max_workers=min(8, len(output_urls))) as pool:
+        results = pool.map(
+            _download_one,
+            output_urls,
+            (output_dir / f"{filename_prefix}_{idx}.mp4" for idx in range(1, len(output_urls) + 1)),
+            (http for _ in output_urls)
+        )
+
+    # map preserves input order; drop the failed entries
+    return [path for path in results if path is not None]
+
+
+class SoundGenerator:
+    """Reusable SFX client for processing many clips on one warm pool.
+
+    Holds a persistent session keyed with the API key, so create-asset,
+    upload and generate calls for successive videos reuse the same
+    connections — per-job overhead becomes header bytes instead of a
+    fresh DNS lookup plus TLS handshake.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, max_concurrency: int = 4):
+        self.api_key = api_key or _DEFAULT_API_KEY
+        if not self.api_key:
+            raise ValueError("API key required. Set MIRELO_API_KEY environment variable or pass api_key parameter")
+        self.max_concurrency = max_concurrency
+        self.session = requests.Session()
+        self.session.headers['x-api-key'] = self.api_key
+        self.session.mount('https://', requests.adapters.HTTPAdapter(
+            pool_connections=max_concurrency, pool_maxsize=max_concurrency * 2,
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        ))
+
+    def process(self, video_source: str, **kwargs) -> List[str]:
+        """Run the full pipeline for one video on the shared session."""
+        return generate_sound_for_video(
+            video_source, api_key=self.api_key, session=self.session, **kwargs
+        )
+
+    def process_many(self, video_sources: List[str], **kwargs) -> List[object]:
+        """Process many videos concurrently, interleaved on the shared pool.
+
+        Returns a list aligned with video_sources; failed entries hold
+        the exception instead of the path list.
+        """
+        def _one(source: str):
+            try:
+                return self.process(source, **kwargs)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            return list(pool.map(_one, video_sources))
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "SoundGenerator":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+async def process_batch(video_sources: List[str], max_concurrent: int = 4, **kwargs) -> List[object]:
+    """Process several videos through the pipeline concurrently.
+
+    Each video still runs download → upload → generate → download-results,
+    but the videos overlap with each other (bounded by max_concurrent), so
+    nothing sits idle waiting on another video's server round trips. The
+    sync client runs on worker threads; this mirrors how the rest of the
+    project drives it from asyncio. kwargs are forwarded to
+    generate_sound_for_video. Returns a list aligned with video_sources;
+    failed entries hold the exception instead of the path list.
+    """
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def _process_one(source: str):
+        async with semaphore:
+            return await asyncio.to_thread(generate_sound_for_video, source, **kwargs)
+
+    return list(await asyncio.gather(
+        *(_process_one(source) for source in video_sources),
+        return_exceptions=True
+    ))
+
+
+def generate_sound_for_videos(video_sources: List[str], max_concurrent: int = 4, **kwargs) -> List[object]:
+    """Sync convenience wrapper around process_batch."""
+    return asyncio.run(process_batch(video_sources, max_concurrent, **kwargs))
 
 
 # Legacy functions for backward compatibility
@@ -255,6 +559,7 @@ Examples:
     python soundgeneration.py "https://example.com/video.mp4"
     python soundgeneration.py "https://example.com/video.mp4" --output-dir ./output
     python soundgeneration.py "https://example.com/video.mp4" --duration 8 --creativity 7
+    python soundgeneration.py "https://example.com/video.mp4" --samples 4   # 4 variants, one upload
         """
     )
     
@@ -263,7 +568,8 @@ Examples:
     parser.add_argument("--output-prefix", "-p", default="result_video", help="Prefix for output filenames (default: result_video)")
     parser.add_argument("--api-key", help="Mirelo API key (or set MIRELO_API_KEY environment variable)")
     parser.add_argument("--duration", "-d", type=int, default=10, help="Duration to process in seconds (default: 10)")
-    parser.add_argument("--samples", "-n", type=int, default=1, help="Number of audio tracks to generate (default: 1)")
+    parser.add_argument("--samples", "-n", type=int, default=1,
+                       help="Number of audio tracks to generate in one job — cheaper than re-running per variant (default: 1)")
     parser.add_argument("--creativity", "-c", type=int, default=5, choices=range(1, 11), help="Creativity level 1-10 (default: 5)")
     parser.add_argument("--text-prompt", "-t", default="cinematic sound effects, ambient sounds, facial reactions, actions", 
                        help="Text guidance for sound generation")
@@ -273,8 +579,8 @@ Examples:
     
     args = parser.parse_args()
     
-    # Get API key from argument or environment
-    api_key = args.api_key or os.getenv("MIRELO_API_KEY")
+    # Get API key from argument or environment (resolved at import)
+    api_key = args.api_key or _DEFAULT_API_KEY
     if not api_key:
         print("❌ Error: API key required. Set MIRELO_API_KEY environment variable or use --api-key")
         sys.exit(1)
@@ -10,47 +10,72 @@ Usage:
 """
 
 import os
+import shutil
 import sys
+import time
 import requests
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Default session so repeated downloads reuse pooled keep-alive connections
+_SESSION = requests.Session()
 
-def download_video(url: str, output_path: str = "input_video.mp4") -> str:
+
+class _ProgressWriter:
+    """File-like wrapper that reports throttled progress as bytes land."""
+
+    def __init__(self, fileobj, total_size: int):
+        self._f = fileobj
+        self._total = total_size
+        self.done = 0
+        self._last_print = 0.0
+
+    def write(self, data) -> int:
+        n = self._f.write(data)
+        self.done += len(data)
+        now = time.monotonic()
+        if self._total and now - self._last_print > 0.05:
+            self._last_print = now
+            percent = (self.done / self._total) * 100
+            sys.stdout.write(f"\r   Progress: {percent:.1f}% ({self.done}/{self._total} bytes)")
+            sys.stdout.flush()
+        return n
+
+
+def download_video(url: str, output_path: str = "input_video.mp4", session=None) -> str:
     """
     Download a video from a URL and save it locally.
-    
+
     Args:
         url: URL of the video to download
         output_path: Path where to save the downloaded video
-        
+        session: Optional requests.Session to reuse connections across calls
+
     Returns:
         Path to the downloaded video file
     """
     print(f"📥 Downloading video from: {url}")
-    
+
     try:
-        response = requests.get(url, stream=True)
+        response = (session or _SESSION).get(url, stream=True, timeout=(5, 60))
         response.raise_for_status()
         
         # Get total file size if available
         total_size = int(response.headers.get('content-length', 0))
         
+        # Copy 1MB blocks straight from the response socket into the file:
+        # no iter_content chunk objects, no whole-body buffering, and the
+        # wrapper keeps the throttled (~20/s) progress line
+        response.raw.decode_content = True
         with open(output_path, 'wb') as f:
-            if total_size == 0:
-                f.write(response.content)
-            else:
-                downloaded = 0
-                chunk_size = 8192
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        # Show progress
-                        percent = (downloaded / total_size) * 100
-                        print(f"\r   Progress: {percent:.1f}% ({downloaded}/{total_size} bytes)", end='')
+            writer = _ProgressWriter(f, total_size)
+            shutil.copyfileobj(response.raw, writer, length=1 << 20)
+        if total_size:
+            # Always land on a final 100% line
+            sys.stdout.write(f"\r   Progress: 100.0% ({writer.done}/{total_size} bytes)")
+            sys.stdout.flush()
         
         print(f"\n✅ Video downloaded successfully to: {output_path}")
         return output_path
@@ -0,0 +1,59 @@
+# cython: boundscheck=False, wraparound=False, language_level=3
+"""Fused data-URI base64 encoder.
+
+Optional extension: writes the MIME prefix and the base64 encoding of
+the image bytes into one output buffer in a single pass, instead of
+encode + concatenate. Build in place with:
+
+    cythonize -i videogeneration/_b64ext.pyx
+
+The importing module falls back to the pure-Python path when the
+extension has not been built.
+"""
+
+from cpython.bytes cimport PyBytes_FromStringAndSize, PyBytes_AS_STRING
+
+cdef const unsigned char* _ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+
+def encode_with_prefix(const unsigned char[:] data, bytes prefix):
+    """Return prefix + base64(data) as bytes, in one allocation."""
+    cdef Py_ssize_t n = data.shape[0]
+    cdef Py_ssize_t plen = len(prefix)
+    cdef Py_ssize_t out_len = plen + ((n + 2) // 3) * 4
+    cdef bytes out = PyBytes_FromStringAndSize(NULL, out_len)
+    cdef unsigned char* o = <unsigned char*> PyBytes_AS_STRING(out)
+    cdef const unsigned char* p = <const unsigned char*> PyBytes_AS_STRING(prefix)
+    cdef Py_ssize_t i, j
+    cdef Py_ssize_t rem
+    cdef unsigned int triple
+
+    for i in range(plen):
+        o[i] = p[i]
+
+    i = 0
+    j = plen
+    while i + 2 < n:
+        triple = (data[i] << 16) | (data[i + 1] << 8) | data[i + 2]
+        o[j] = _ALPHABET[(triple >> 18) & 0x3F]
+        o[j + 1] = _ALPHABET[(triple >> 12) & 0x3F]
+        o[j + 2] = _ALPHABET[(triple >> 6) & 0x3F]
+        o[j + 3] = _ALPHABET[triple & 0x3F]
+        i += 3
+        j += 4
+
+    rem = n - i
+    if rem == 1:
+        triple = data[i] << 16
+        o[j] = _ALPHABET[(triple >> 18) & 0x3F]
+        o[j + 1] = _ALPHABET[(triple >> 12) & 0x3F]
+        o[j + 2] = 61  # '='
+        o[j + 3] = 61
+    elif rem == 2:
+        triple = (data[i] << 16) | (data[i + 1] << 8)
+        o[j] = _ALPHABET[(triple >> 18) & 0x3F]
+        o[j + 1] = _ALPHABET[(triple >> 12) & 0x3F]
+        o[j + 2] = _ALPHABET[(triple >> 6) & 0x3F]
+        o[j + 3] = 61
+
+    return out
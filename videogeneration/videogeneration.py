@@ -15,48 +15,244 @@ Requirements:
 """
 
 import argparse
+import asyncio
 import base64
+import concurrent.futures
+import functools
+import io
 import json
+import mmap
 import os
+import random
 import sys
 import time
 import uuid
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 import requests
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file (skippable so library imports
+# don't walk the filesystem looking for one)
+if os.getenv("SKIP_DOTENV") != "1":
+    load_dotenv()
+
+# pybase64 dispatches to SIMD-vectorized encoders (AVX2/SSSE3/NEON) and is
+# several-fold faster than stdlib base64 on multi-MB frame images; fall
+# back to the stdlib module when it is not installed
+try:
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
+
+# orjson's C encoder walks the multi-MB base64 strings several-fold
+# faster than stdlib json, on both the submit and the poll decode; fall
+# back to the stdlib when it is not installed
+try:
+    import orjson
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    _json_loads = json.loads
+
+
+# Pillow is optional and only used to shrink oversized sources before
+# upload; without it images are sent as-is
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# With websockets installed, result waiting subscribes over one
+# long-lived connection and hears about completion within a round-trip
+# of the event; otherwise the HTTP polling loop below is used
+try:
+    from websockets.sync.client import connect as _ws_connect
+except ImportError:
+    _ws_connect = None
+
+# Optional hand-built Cython extension that fuses the data-URI prefix
+# and the base64 encode into one pass (cythonize -i _b64ext.pyx); absent
+# unless built, in which case the pure-Python path below is used
+try:
+    from _b64ext import encode_with_prefix as _encode_with_prefix
+except ImportError:
+    _encode_with_prefix = None
+
+# Shared by the CLI and the convenience wrapper so the two stay in sync
+_DEFAULT_PROMPT = (
+    "smooth animation, natural movement, facial reactions and actions only, "
+    "NO Lip movement, high quality"
+)
+
+_MIME_MAP = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.webp': 'image/webp'
+}
+
+
+def _stream_b64(path: str, chunk_size: int = 48 * 1024) -> bytearray:
+    """Base64-encode a file in fixed 48KB windows.
+
+    48KB is a multiple of 3, so no padding appears mid-stream and the
+    chunk encodings concatenate cleanly. Peak memory stays bounded by the
+    window plus the growing output, instead of holding the raw bytes and
+    the full encoding simultaneously.
+    """
+    buf = bytearray()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            buf += _b64.b64encode(chunk)
+    return buf
+
+
+def _file_b64(path: str) -> bytes:
+    """Base64-encode a whole file from a read-only mmap view.
+
+    The encoder consumes the mapping through the buffer protocol, so the
+    raw file bytes are never copied into a Python object — only the
+    base64 output is allocated. Falls back to windowed streaming when the
+    file can't be mapped (empty files, exotic filesystems).
+    """
+    with open(path, 'rb') as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _b64.b64encode(mm)
+        except (ValueError, OSError):
+            return bytes(_stream_b64(path))
+
+
+def _downscale(abs_path: str, max_size: Tuple[int, int]) -> Optional[Tuple[bytes, str]]:
+    """Resize an oversized source image to the target frame size.
+
+    The model consumes at most max_size pixels, so anything larger is
+    pure base64/upload cost. Returns (image_bytes, mime_type), or None
+    when the image already fits, Pillow is unavailable, or the file
+    can't be decoded (callers then send the original bytes).
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(abs_path) as img:
+            if img.width <= max_size[0] and img.height <= max_size[1]:
+                return None
+            img.thumbnail(max_size, Image.LANCZOS)
+            buf = io.BytesIO()
+            if 'A' in img.getbands():
+                img.save(buf, format='PNG')  # keep the alpha channel
+                return buf.getvalue(), 'image/png'
+            img.convert('RGB').save(buf, format='JPEG', quality=92)
+            return buf.getvalue(), 'image/jpeg'
+    except Exception:
+        return None
+
+
+@functools.lru_cache(maxsize=8)
+def _encode_cached(realpath: str, mtime_ns: int, size: int, mime_type: str,
+                   max_size: Optional[Tuple[int, int]]) -> str:
+    """Build the data URI for an image file, memoized by identity + stat.
+
+    mtime_ns and size sit in the key purely to invalidate the entry when
+    the file changes; repeated encodes of an unchanged image (parameter
+    sweeps, retries) return the cached URI in O(1).
+    """
+    downscaled = _downscale(realpath, max_size) if max_size else None
+    if downscaled is not None:
+        image_bytes, mime_type = downscaled
+        print(f"📐 Downscaled to fit {max_size[0]}x{max_size[1]} ({len(image_bytes)} bytes)")
+    else:
+        image_bytes = None
+
+    prefix = b"data:" + mime_type.encode('ascii') + b";base64,"
+
+    if _encode_with_prefix is not None:
+        # Fused C path: prefix + encode in a single pass and allocation
+        if image_bytes is None:
+            with open(realpath, 'rb') as f:
+                image_bytes = f.read()
+        return _encode_with_prefix(image_bytes, prefix).decode('ascii')
+
+    b64_body = _b64.b64encode(image_bytes) if image_bytes is not None else _file_b64(realpath)
+    # Assemble the data URI in one buffer and decode once — no
+    # intermediate str copy of the multi-MB base64 body
+    buf = bytearray(prefix)
+    buf += b64_body
+    return buf.decode('ascii')
 
 
 class ImageToVideoGenerator:
     """Handles image-to-video generation using Runware API."""
     
-    def __init__(self, api_key: str, base_url: str = "https://api.runware.ai/v1"):
+    def __init__(self, api_key: str, base_url: str = "https://api.runware.ai/v1",
+                 session: Optional[requests.Session] = None):
         """
         Initialize the generator with API credentials.
-        
+
         Args:
             api_key: Runware API key
             base_url: Base URL for the Runware API
+            session: Optional requests.Session to reuse connections across calls
         """
         self.api_key = api_key
         self.base_url = base_url
+        self.ws_url = base_url.replace("https://", "wss://", 1) + "/ws"
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
+        # Reuse the caller's session when provided; otherwise own one so
+        # the submit, the ~30 polls per job and the download all share
+        # keep-alive connections instead of a TLS handshake each
+        if session is not None:
+            self.http = session
+            self._owns_session = False
+        else:
+            self.http = requests.Session()
+            self.http.mount("https://", requests.adapters.HTTPAdapter(
+                pool_connections=2, pool_maxsize=4,
+                max_retries=Retry(total=3, backoff_factor=0.3,
+                                  status_forcelist=[429, 500, 502, 503, 504])
+            ))
+            self._owns_session = True
+
+    def _warm_connection(self) -> None:
+        """Open (and pool) a connection to the API host ahead of time."""
+        try:
+            self.http.head(self.base_url, timeout=5)
+        except Exception:
+            pass  # best-effort; the real POST will surface any failure
+
+    def close(self) -> None:
+        """Close the session if this generator created it."""
+        if self._owns_session:
+            self.http.close()
+
+    def __enter__(self) -> "ImageToVideoGenerator":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
     
-    def encode_image_to_base64(self, image_path: str) -> str:
+    def encode_image_to_base64(self, image_path: str, max_size: Optional[Tuple[int, int]] = None) -> str:
         """
         Encode an image file to base64 string.
-        
+
         Args:
             image_path: Path to the image file
-            
+            max_size: Optional (width, height) target; larger sources are
+                downscaled and recompressed before encoding
+
         Returns:
             Base64 encoded image string with data URI prefix
-            
+
         Raises:
             Exception: If encoding fails
         """
@@ -71,23 +267,19 @@ class ImageToVideoGenerator:
         
         # Determine MIME type based on file extension
         ext = os.path.splitext(abs_path)[1].lower()
-        mime_type_map = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg', 
-            '.png': 'image/png',
-            '.webp': 'image/webp'
-        }
-        
-        mime_type = mime_type_map.get(ext, 'image/jpeg')
+        mime_type = _MIME_MAP.get(ext, 'image/jpeg')
         print(f"📄 Detected MIME type: {mime_type}")
-        
+
         try:
-            with open(abs_path, 'rb') as f:
-                image_data = f.read()
-                base64_encoded = base64.b64encode(image_data).decode('utf-8')
-                data_uri = f"data:{mime_type};base64,{base64_encoded}"
-                print(f"✅ Image encoded successfully, length: {len(data_uri)} characters")
-                return data_uri
+            # The cache key carries mtime+size so an unchanged file hits
+            # in O(1) across repeated generate calls (sweeps, retries)
+            st = os.stat(abs_path)
+            data_uri = _encode_cached(
+                os.path.realpath(abs_path), st.st_mtime_ns, st.st_size,
+                mime_type, max_size
+            )
+            print(f"✅ Image encoded successfully, length: {len(data_uri)} characters")
+            return data_uri
         except Exception as e:
             raise Exception(f"Failed to encode image: {str(e)}")
     
@@ -102,7 +294,8 @@ class ImageToVideoGenerator:
         model: str = "bytedance:1@1",
         output_format: str = "mp4",
         output_quality: int = 95,
-        frame_position: str = "first"
+        frame_position: str = "first",
+        warmup: bool = True
     ) -> Dict[str, Any]:
         """
         Generate a video from an image using Runware API.
@@ -118,20 +311,90 @@ class ImageToVideoGenerator:
             output_format: Output video format (mp4 or webm)
             output_quality: Output quality (20-99)
             frame_position: Position of the input image ("first", "last", or frame number)
-            
+            warmup: Open the API connection in the background while the
+                image encodes, hiding the TLS handshake
+
         Returns:
             Dictionary containing the generation request response
         """
-        # Encode image to base64
-        print(f"📤 Encoding image: {image_path}")
-        image_data = self.encode_image_to_base64(image_path)
-        print("✓ Image encoded successfully")
+        # Kick off the connection warmup so the DNS lookup + TLS
+        # handshake run concurrently with the base64 encode below; the
+        # pooled connection is then reused by the actual POST
+        warm_future = None
+        if warmup:
+            warm_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+            warm_future = warm_pool.submit(self._warm_connection)
+
+        request_data = self._build_task(
+            image_path,
+            positive_prompt=positive_prompt,
+            duration=duration,
+            width=width,
+            height=height,
+            fps=fps,
+            model=model,
+            output_format=output_format,
+            output_quality=output_quality,
+            frame_position=frame_position
+        )
+        task_uuid = request_data["taskUUID"]
+
+        if warm_future is not None:
+            warm_future.result()
+            warm_pool.shutdown(wait=False)
+
+        print(f"🎬 Starting video generation with task UUID: {task_uuid}")
+        print(f"   Duration: {duration}s, Resolution: {width}x{height}, FPS: {fps}")
+        print(f"   Model: {model}")
+        if positive_prompt:
+            print(f"   Prompt: {positive_prompt}")
         
-        task_uuid = str(uuid.uuid4())
+        # Runware only accepts frame images as data URIs inside the JSON
+        # body (no binary/multipart path), so base64 stays — but encode
+        # the body once here and send the bytes, instead of letting
+        # requests walk the multi-MB string through json.dumps again
+        response = self.http.post(
+            f"{self.base_url}/",
+            headers=self.headers,
+            data=_json_dumps([request_data])
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"Failed to start video generation: {response.text}")
+
+        result = _json_loads(response.content)
+        if "errors" in result and result["errors"]:
+            raise Exception(f"Video generation error: {result['errors'][0]['message']}")
         
-        request_data = {
+        return {"taskUUID": task_uuid, "response": result}
+
+    def _build_task(
+        self,
+        image_path: str,
+        positive_prompt: str = "",
+        duration: int = 5,
+        width: int = 1248,
+        height: int = 704,
+        fps: int = 24,
+        model: str = "bytedance:1@1",
+        output_format: str = "mp4",
+        output_quality: int = 95,
+        frame_position: str = "first"
+    ) -> Dict[str, Any]:
+        """Assemble one videoInference task dict with a fresh taskUUID.
+
+        Shared by generate_video and generate_videos so single and batch
+        submissions build identical per-task payloads. Encoding downscales
+        anything larger than the output frame first — extra pixels are
+        pure upload cost.
+        """
+        print(f"📤 Encoding image: {image_path}")
+        image_data = self.encode_image_to_base64(image_path, max_size=(width, height))
+        print("✓ Image encoded successfully")
+
+        task = {
             "taskType": "videoInference",
-            "taskUUID": task_uuid,
+            "taskUUID": str(uuid.uuid4()),
             "deliveryMethod": "async",
             "model": model,
             "duration": duration,
@@ -150,100 +413,254 @@ class ImageToVideoGenerator:
                 }
             ]
         }
-        
-        # Add positive prompt if provided
         if positive_prompt:
-            request_data["positivePrompt"] = positive_prompt
-        
-        print(f"🎬 Starting video generation with task UUID: {task_uuid}")
-        print(f"   Duration: {duration}s, Resolution: {width}x{height}, FPS: {fps}")
-        print(f"   Model: {model}")
-        if positive_prompt:
-            print(f"   Prompt: {positive_prompt}")
-        
-        response = requests.post(
+            task["positivePrompt"] = positive_prompt
+        return task
+
+    def generate_videos(self, specs: list) -> list:
+        """Submit several videoInference tasks in a single POST.
+
+        Each spec is a dict of _build_task keyword arguments (image_path
+        plus any per-task overrides). The API body is a JSON list, so N
+        generations share one TLS handshake and one HTTP round-trip
+        instead of N. Returns one {"taskUUID", "response"} dict per spec
+        in input order; pair with poll_results to wait for them.
+        """
+        tasks = [self._build_task(**spec) for spec in specs]
+
+        print(f"🎬 Submitting batch of {len(tasks)} video task(s) in one request")
+        response = self.http.post(
             f"{self.base_url}/",
             headers=self.headers,
-            json=[request_data]
+            data=_json_dumps(tasks)
         )
-        
+
         if response.status_code != 200:
-            raise Exception(f"Failed to start video generation: {response.text}")
-        
-        result = response.json()
+            raise Exception(f"Failed to start batch video generation: {response.text}")
+
+        result = _json_loads(response.content)
         if "errors" in result and result["errors"]:
-            raise Exception(f"Video generation error: {result['errors'][0]['message']}")
-        
-        return {"taskUUID": task_uuid, "response": result}
-    
+            raise Exception(f"Batch video generation error: {result['errors'][0]['message']}")
+
+        return [{"taskUUID": task["taskUUID"], "response": result} for task in tasks]
+
+    def _wait_via_websocket(self, task_uuids: list, timeout: int) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Wait for task completion over a single WebSocket subscription.
+
+        All UUIDs are subscribed on one long-lived connection, so N tasks
+        share one socket and completion is seen as soon as the server
+        announces it. Returns a taskUUID -> terminal-status-data mapping
+        (entries may carry status "error"; callers decide how to surface
+        that), with tasks still pending at the deadline simply absent.
+        Returns None when websockets is not installed or the endpoint
+        can't be used, in which case callers fall back to HTTP polling.
+        """
+        if _ws_connect is None:
+            return None
+
+        deadline = time.time() + timeout
+        try:
+            ws = _ws_connect(
+                self.ws_url,
+                additional_headers={"Authorization": f"Bearer {self.api_key}"},
+                open_timeout=10
+            )
+        except Exception as e:
+            print(f"⚠️  WebSocket endpoint unavailable ({e}); falling back to polling")
+            return None
+
+        finished: Dict[str, Dict[str, Any]] = {}
+        pending = set(task_uuids)
+        try:
+            for task_uuid in task_uuids:
+                ws.send(_json_dumps({"subscribe": task_uuid}).decode())
+            while pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                payload = _json_loads(ws.recv(timeout=remaining))
+                for data in payload.get("data") or []:
+                    task_uuid = data.get("taskUUID")
+                    if task_uuid in pending and data.get("status") in ("success", "error"):
+                        finished[task_uuid] = data
+                        pending.discard(task_uuid)
+        except Exception as e:
+            if pending:
+                print(f"⚠️  WebSocket wait interrupted ({e}); falling back to polling")
+                return None
+        finally:
+            ws.close()
+        return finished
+
     def poll_result(self, task_uuid: str, timeout: int = 300) -> Dict[str, Any]:
         """
-        Poll for video generation results.
-        
+        Wait for video generation results.
+
+        Prefers a WebSocket subscription when available (one connection,
+        no polling traffic) and falls back to HTTP polling otherwise.
+
         Args:
             task_uuid: UUID of the generation task
             timeout: Maximum time to wait in seconds
-            
+
         Returns:
             Dictionary containing the final result
         """
+        ws_results = self._wait_via_websocket([task_uuid], timeout)
+        if ws_results is not None:
+            data = ws_results.get(task_uuid)
+            if data is None:
+                raise Exception("Timeout waiting for video generation to complete")
+            if data.get("status") == "error":
+                raise Exception(f"Generation failed: {data.get('message', 'Unknown error')}")
+            print("✅ Video generation completed!")
+            return data
+
         print("⏳ Polling for results...")
         print("💡 Video generation typically takes 2-5 minutes for high-quality results")
         print("   You can press Ctrl+C to cancel if needed")
         start_time = time.time()
         poll_count = 0
-        
+        # Start polling quickly (many jobs finish in well under a minute)
+        # and back off exponentially toward a 15s cap for the long ones
+        delay = 2.0
+
         while time.time() - start_time < timeout:
             poll_count += 1
             elapsed = int(time.time() - start_time)
-            
-            poll_request = {
-                "taskType": "getResponse",
-                "taskUUID": task_uuid
-            }
-            
-            response = requests.post(
+
+            data = self._check_result(task_uuid, elapsed, poll_count)
+            if data is not None:
+                return data
+
+            print("   💭 Tip: Video generation is compute-intensive and may take several minutes")
+            # Jitter keeps parallel pollers from synchronizing their hits
+            time.sleep(delay + random.uniform(0, 0.5))
+            delay = min(15.0, delay * 1.5)
+
+        raise Exception("Timeout waiting for video generation to complete")
+
+    def poll_results(self, task_uuids: list, timeout: int = 300) -> Dict[str, Dict[str, Any]]:
+        """Wait for several generation tasks at once.
+
+        Each poll interval issues a single getResponse POST carrying an
+        entry per outstanding UUID, so a batch of N tasks generates the
+        same polling traffic as one. The WebSocket subscription is tried
+        first when available. Returns a taskUUID -> result-data mapping;
+        failed tasks map to entries with status "error" and tasks still
+        unfinished at the timeout are simply absent.
+        """
+        ws_results = self._wait_via_websocket(list(task_uuids), timeout)
+        if ws_results is not None:
+            return ws_results
+
+        print(f"⏳ Polling for {len(task_uuids)} task(s)...")
+        start_time = time.time()
+        delay = 2.0
+        finished: Dict[str, Dict[str, Any]] = {}
+        pending = set(task_uuids)
+
+        while pending and time.time() - start_time < timeout:
+            response = self.http.post(
                 f"{self.base_url}/",
                 headers=self.headers,
-                json=[poll_request]
+                data=_json_dumps([
+                    {"taskType": "getResponse", "taskUUID": u} for u in pending
+                ])
             )
-            
+
             if response.status_code != 200:
                 print(f"⚠️  Polling error: {response.text}")
-                time.sleep(5)
-                continue
-            
-            result = response.json()
-            
-            # Check if we have data (completed)
-            if "data" in result and result["data"]:
-                data = result["data"][0]
-                if data.get("status") == "success":
-                    print("✅ Video generation completed!")
-                    return data
-                elif data.get("status") == "error":
-                    raise Exception(f"Generation failed: {data.get('message', 'Unknown error')}")
-            
-            # Check for errors
-            if "errors" in result and result["errors"]:
-                error = result["errors"][0]
-                if error.get("code") == "taskNotFound":
-                    print(f"⏳ Task still processing... ({elapsed}s elapsed, poll #{poll_count})")
-                else:
-                    raise Exception(f"Polling error: {error['message']}")
             else:
-                print(f"⏳ Still processing... ({elapsed}s elapsed, poll #{poll_count})")
-            
-            print("   💭 Tip: Video generation is compute-intensive and may take several minutes")
-            time.sleep(10)
-        
+                result = _json_loads(response.content)
+                for data in result.get("data") or []:
+                    task_uuid = data.get("taskUUID")
+                    if task_uuid in pending and data.get("status") in ("success", "error"):
+                        finished[task_uuid] = data
+                        pending.discard(task_uuid)
+
+            if pending:
+                elapsed = int(time.time() - start_time)
+                print(f"⏳ {len(pending)} task(s) still processing... ({elapsed}s elapsed)")
+                time.sleep(delay + random.uniform(0, 0.5))
+                delay = min(15.0, delay * 1.5)
+
+        return finished
+
+    def _check_result(self, task_uuid: str, elapsed: int, poll_count: int) -> Optional[Dict[str, Any]]:
+        """Issue one getResponse poll.
+
+        Returns the result data when the task has finished, None while it
+        is still processing (or on a transient polling error), and raises
+        on fatal generation/polling errors.
+        """
+        poll_request = {
+            "taskType": "getResponse",
+            "taskUUID": task_uuid
+        }
+
+        response = self.http.post(
+            f"{self.base_url}/",
+            headers=self.headers,
+            data=_json_dumps([poll_request])
+        )
+
+        if response.status_code != 200:
+            print(f"⚠️  Polling error: {response.text}")
+            return None
+
+        result = _json_loads(response.content)
+
+        # Check if we have data (completed)
+        if "data" in result and result["data"]:
+            data = result["data"][0]
+            if data.get("status") == "success":
+                print("✅ Video generation completed!")
+                return data
+            elif data.get("status") == "error":
+                raise Exception(f"Generation failed: {data.get('message', 'Unknown error')}")
+
+        # Check for errors
+        if "errors" in result and result["errors"]:
+            error = result["errors"][0]
+            if error.get("code") == "taskNotFound":
+                print(f"⏳ Task still processing... ({elapsed}s elapsed, poll #{poll_count})")
+            else:
+                raise Exception(f"Polling error: {error['message']}")
+        else:
+            print(f"⏳ Still processing... ({elapsed}s elapsed, poll #{poll_count})")
+        return None
+
+    async def poll_result_async(self, task_uuid: str, timeout: int = 300) -> Dict[str, Any]:
+        """Async counterpart of poll_result for concurrent jobs.
+
+        Waits in asyncio.sleep and runs each poll request on a worker
+        thread, so a batch of tasks can be awaited with asyncio.gather on
+        one event loop instead of parking an OS thread per job for the
+        whole generation. Same protocol and backoff as poll_result.
+        """
+        start_time = time.time()
+        poll_count = 0
+        delay = 2.0
+
+        while time.time() - start_time < timeout:
+            poll_count += 1
+            elapsed = int(time.time() - start_time)
+
+            data = await asyncio.to_thread(self._check_result, task_uuid, elapsed, poll_count)
+            if data is not None:
+                return data
+
+            await asyncio.sleep(delay + random.uniform(0, 0.5))
+            delay = min(15.0, delay * 1.5)
+
         raise Exception("Timeout waiting for video generation to complete")
 
 
 def generate_video_from_image(
     image_path: str,
     output_path: Optional[str] = None,
-    positive_prompt: str = "smooth animation, natural movement, facial reactions and actions only, NO Lip movement, high quality",
+    positive_prompt: str = _DEFAULT_PROMPT,
     duration: int = 5,
     width: int = 1248,
     height: int = 704,
@@ -253,7 +670,8 @@ def generate_video_from_image(
     output_quality: int = 95,
     frame_position: str = "first",
     api_key: Optional[str] = None,
-    timeout: int = 300
+    timeout: int = 300,
+    session: Optional[requests.Session] = None
 ) -> Dict[str, Any]:
     """
     Generate a video from an image using Runware API.
@@ -272,7 +690,8 @@ def generate_video_from_image(
         frame_position: Position of the input image ("first", "last", or frame number)
         api_key: Runware API key (if not provided, uses RUNWARE_API_KEY env var)
         timeout: Timeout for video generation in seconds
-        
+        session: Optional requests.Session to reuse connections across calls
+
     Returns:
         Dictionary containing video information including URL and metadata
         
@@ -286,7 +705,7 @@ def generate_video_from_image(
     
     try:
         # Initialize the generator
-        generator = ImageToVideoGenerator(api_key)
+        generator = ImageToVideoGenerator(api_key, session=session)
         
         # Generate the video
         generation_result = generator.generate_video(
@@ -305,32 +724,137 @@ def generate_video_from_image(
         # Poll for results
         result = generator.poll_result(generation_result["taskUUID"], timeout)
         
-        # Download video if output path specified
+        # Download video if output path specified (over the same pool)
         if output_path:
-            print(f"📥 Downloading video to: {output_path}")
-            
-            # Ensure output directory exists
-            output_dir = os.path.dirname(output_path)
-            if output_dir:
-                os.makedirs(output_dir, exist_ok=True)
-            
-            video_response = requests.get(result['videoURL'])
-            if video_response.status_code == 200:
-                with open(output_path, 'wb') as f:
-                    f.write(video_response.content)
-                print("✅ Video downloaded successfully!")
-                result['local_path'] = os.path.abspath(output_path)
-            else:
-                print(f"⚠️  Failed to download video: {video_response.status_code}")
-        
+            _download_video(result, output_path, session or generator.http)
+
         return result
-        
+
     except Exception as e:
         raise Exception(f"Video generation failed: {str(e)}")
 
 
-def main():
-    """Main function to handle command line arguments and orchestrate the process."""
+def _download_video(result: Dict[str, Any], output_path: str, session: Optional[requests.Session] = None) -> None:
+    """Download a finished video to output_path and record its local path."""
+    print(f"📥 Downloading video to: {output_path}")
+
+    # Ensure output directory exists
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    # Stream in 64KB chunks: memory stays flat instead of holding the
+    # whole MP4 as one bytes object before the write
+    with (session or requests).get(result['videoURL'], stream=True, timeout=60) as video_response:
+        if video_response.status_code != 200:
+            print(f"⚠️  Failed to download video: {video_response.status_code}")
+            return
+        with open(output_path, 'wb') as f:
+            for chunk in video_response.iter_content(chunk_size=65536):
+                f.write(chunk)
+    print("✅ Video downloaded successfully!")
+    result['local_path'] = os.path.abspath(output_path)
+
+
+def generate_videos_from_images(
+    image_paths: list,
+    output_paths: Optional[list] = None,
+    positive_prompts: Optional[list] = None,
+    duration: int = 5,
+    width: int = 1248,
+    height: int = 704,
+    fps: int = 24,
+    model: str = "bytedance:1@1",
+    output_format: str = "mp4",
+    output_quality: int = 95,
+    frame_position: str = "first",
+    api_key: Optional[str] = None,
+    timeout: int = 300,
+    session: Optional[requests.Session] = None
+) -> list:
+    """
+    Generate videos for several images with one upstream submission.
+
+    The Runware request body is a JSON list, so N videoInference tasks can
+    share a single POST (one handshake, one auth pass) instead of N.
+    Results come back in input order; a failed task yields an entry with
+    'error' set rather than raising, so one bad image doesn't sink the
+    whole batch.
+
+    Args:
+        image_paths: Paths to the input image files
+        output_paths: Optional per-image paths to save the generated videos
+        positive_prompts: Optional per-image text prompts
+        (remaining arguments are shared by all tasks; see
+        generate_video_from_image)
+
+    Returns:
+        List of per-image result dictionaries
+    """
+    api_key = api_key or os.getenv("RUNWARE_API_KEY")
+    if not api_key:
+        raise ValueError("API key required. Set RUNWARE_API_KEY environment variable or pass api_key parameter")
+
+    generator = ImageToVideoGenerator(api_key, session=session)
+
+    # Per-image specs over the shared parameters; generate_videos packs
+    # them into one POST
+    specs = []
+    for i, image_path in enumerate(image_paths):
+        spec = {
+            "image_path": image_path,
+            "duration": duration,
+            "width": width,
+            "height": height,
+            "fps": fps,
+            "model": model,
+            "output_format": output_format,
+            "output_quality": output_quality,
+            "frame_position": frame_position,
+        }
+        prompt = positive_prompts[i] if positive_prompts else None
+        if prompt:
+            spec["positive_prompt"] = prompt
+        specs.append(spec)
+
+    submissions = generator.generate_videos(specs)
+    task_uuids = [s["taskUUID"] for s in submissions]
+
+    # One subscription socket or one amortized getResponse per interval
+    # for the whole batch
+    finished = generator.poll_results(task_uuids, timeout)
+
+    # Collect each task; failures are recorded per entry instead of raised
+    results = []
+    for i, task_uuid in enumerate(task_uuids):
+        data = finished.get(task_uuid)
+        if data is None:
+            result = {"error": "Timeout waiting for video generation to complete",
+                      "taskUUID": task_uuid}
+        elif data.get("status") == "error":
+            result = {"error": f"Generation failed: {data.get('message', 'Unknown error')}",
+                      "taskUUID": task_uuid}
+        else:
+            result = data
+            output_path = output_paths[i] if output_paths else None
+            if output_path:
+                try:
+                    _download_video(result, output_path, session or generator.http)
+                except Exception as e:
+                    result = {"error": str(e), "taskUUID": task_uuid}
+        results.append(result)
+
+    return results
+
+
+def _quality(value: str) -> int:
+    """Parse --quality, clamping into the API's supported 20-99 range."""
+    return max(20, min(99, int(value)))
+
+
+@functools.cache
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the CLI parser once; cached for repeated in-process invocations."""
     parser = argparse.ArgumentParser(
         description="Generate a video from an image using Runware API",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -343,7 +867,7 @@ Examples:
     )
     
     parser.add_argument("image_path", nargs='?', default="test.png", help="Path to the input image file (default: test.png)")
-    parser.add_argument("--prompt", "-p", default="smooth animation, natural movement, facial reactions and actions only, NO Lip movement, high quality", 
+    parser.add_argument("--prompt", "-p", default=_DEFAULT_PROMPT,
                        help="Text prompt to guide video generation")
     parser.add_argument("--duration", "-d", type=int, default=5,
                        help="Video duration in seconds (default: 5)")
@@ -357,8 +881,8 @@ Examples:
                        help="Model to use for generation (default: bytedance:1@1)")
     parser.add_argument("--format", "-f", choices=["mp4", "webm"], default="mp4",
                        help="Output video format (default: mp4)")
-    parser.add_argument("--quality", "-q", type=int, default=95, choices=range(20, 100),
-                       help="Output quality 20-99 (default: 95)")
+    parser.add_argument("--quality", "-q", type=_quality, default=95,
+                       help="Output quality 20-99, clamped (default: 95)")
     parser.add_argument("--frame-position", choices=["first", "last"], default="first",
                        help="Position of input image in video (default: first)")
     parser.add_argument("--api-key", 
@@ -367,9 +891,14 @@ Examples:
                        help="Timeout for video generation in seconds (default: 300)")
     parser.add_argument("--output", "-o",
                        help="Output filename (optional, will use video UUID if not specified)")
-    
-    args = parser.parse_args()
-    
+
+    return parser
+
+
+def main():
+    """Main function to handle command line arguments and orchestrate the process."""
+    args = _build_parser().parse_args()
+
     # Get API key from argument or environment
     api_key = args.api_key or os.getenv("RUNWARE_API_KEY")
     if not api_key:
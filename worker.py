@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Background Pipeline Worker
+
+Holds the video+sound generation pipeline so it can run either inline
+(when no job queue is configured) or on an RQ worker process:
+
+    rq worker --url redis://localhost:6379/0 kindergarten
+
+The HTTP layer in server.py only saves uploads and enqueues
+run_pipeline; all upstream API traffic happens here.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import socket
+import sys
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import requests
+from urllib3.util.retry import Retry
+
+# Add the module directories to Python path
+sys.path.append(str(Path(__file__).parent / "videogeneration"))
+sys.path.append(str(Path(__file__).parent / "soundgeneration"))
+
+from videogeneration import generate_video_from_image, generate_videos_from_images
+from soundgeneration import generate_sound_for_video
+
+# Base prompt shared by every video task
+SYSTEM_PROMPT = "smooth animation, natural movement, facial reactions and actions only, NO Lip movement, high quality"
+
+# Worker threads enqueue log records instead of serializing on the stdout
+# lock the way print() does; a single listener thread performs the writes
+_LOG_Q = queue.SimpleQueue()
+_LOG_HANDLER = logging.StreamHandler()
+_LOG_HANDLER.setFormatter(logging.Formatter('%(message)s'))
+_LOG_LISTENER = logging.handlers.QueueListener(_LOG_Q, _LOG_HANDLER)
+_LOG_LISTENER.start()
+atexit.register(_LOG_LISTENER.stop)
+
+log = logging.getLogger('kai')
+log.addHandler(logging.handlers.QueueHandler(_LOG_Q))
+log.setLevel(logging.INFO)
+
+logger = logging.getLogger('kai.worker')
+logger.setLevel(logging.WARNING)  # debug diagnostics are opt-in
+
+class _NoDelayAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter with Nagle's algorithm turned off.
+
+    Upstream traffic is small request bodies followed by long waits, the
+    worst case for Nagle buffering — flush each write immediately.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)]
+        super().init_poolmanager(*args, **kwargs)
+
+
+# Shared HTTP session so parallel API calls reuse pooled keep-alive
+# connections instead of paying a TCP+TLS handshake per request
+_SESSION = requests.Session()
+_SESSION.mount('https://', _NoDelayAdapter(
+    pool_connections=64, pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+))
+
+# Shared worker pools: concurrency is bounded by configured capacity, not by
+# how many images each job uploads, so concurrent jobs can no longer
+# multiply into an unbounded number of upstream calls
+VIDEO_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.environ.get('VIDEO_WORKERS', 8)), thread_name_prefix='vid')
+SOUND_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.environ.get('SOUND_WORKERS', 8)), thread_name_prefix='snd')
+# Admission control for the upstream providers across all jobs
+UPSTREAM_SEM = threading.BoundedSemaphore(int(os.environ.get('UPSTREAM_CONCURRENCY', 16)))
+
+
+def process_single_image(image_path: str, index: int, output_dir: str, custom_prompt: Optional[str] = None,
+                         download: bool = True) -> Dict[str, Any]:
+    """Process a single image into video (same as example_usage.py).
+
+    With download=False the generated video stays on the provider's CDN
+    (clients get video_url) and no bytes are pulled locally — only the
+    sound stage actually needs a local copy.
+    """
+    output_filename = f"video_{index+1:02d}.mp4"
+    output_path = os.path.join(output_dir, output_filename)
+    img_base = os.path.basename(image_path)  # reused in every print/result path
+
+    # Known failure mode checked up front instead of via exception
+    if not os.path.isfile(image_path):
+        log.info(f"❌ Video {index + 1} failed: {img_base} - image not found")
+        return {
+            'index': index,
+            'image_filename': img_base,
+            'success': False,
+            'error': f'Image not found: {image_path}'
+        }
+
+    log.info(f"🎬 Generating video {index + 1} from: {img_base}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("video %d src=%s size=%d out=%s",
+                     index + 1, image_path, os.stat(image_path).st_size, output_path)
+
+    # Combine system prompt with custom prompt if provided
+    if custom_prompt:
+        positive_prompt = f"{SYSTEM_PROMPT}, {custom_prompt}"
+        log.info(f"   📝 Using custom prompt: {custom_prompt}")
+    else:
+        positive_prompt = SYSTEM_PROMPT
+
+    log.info(f"   🤖 Using model: bytedance:1@1")
+    # Only the upstream call sits in the try block; the client wraps all of
+    # its failures (HTTP errors, timeouts, bad responses) in Exception
+    try:
+        with UPSTREAM_SEM:
+            result = generate_video_from_image(
+                image_path=image_path,
+                output_path=output_path if download else None,
+                positive_prompt=positive_prompt,
+                duration=5,
+                model="bytedance:1@1",
+                width=1248,
+                height=704,
+                fps=24,
+                session=_SESSION
+            )
+    except Exception as e:
+        log.info(f"❌ Video {index + 1} failed: {img_base} - {e}")
+        return {
+            'index': index,
+            'image_filename': img_base,
+            'success': False,
+            'error': str(e)
+        }
+
+    log.info(f"✅ Video {index + 1} completed: {output_filename}")
+    video_result = {
+        'index': index,
+        'image_filename': img_base,
+        'video_url': result['videoURL'],
+        'model_used': "bytedance:1@1",
+        'success': True
+    }
+    if download:
+        video_result['video_filename'] = output_filename
+        video_result['video_path'] = output_path
+    return video_result
+
+def process_single_sound(video_result: Dict[str, Any], output_dir: str) -> Dict[str, Any]:
+    """Add sound to a single video."""
+    index = video_result['index']
+    video_path = video_result['video_path']
+    vid_base = os.path.basename(video_path)  # reused in every print path
+
+    # Known failure mode checked up front instead of via exception
+    if not os.path.isfile(video_path):
+        log.info(f"❌ Sound {index + 1} failed: {vid_base} - video not found")
+        return {
+            'index': index,
+            'video_path': video_path,
+            'success': False,
+            'error': f'Video not found: {video_path}'
+        }
+
+    log.info(f"🎵 Adding sound to video {index + 1}: {vid_base}")
+
+    try:
+        with UPSTREAM_SEM:
+            sound_video_paths = generate_sound_for_video(
+                video_source=video_path,  # Use local file (no re-download)
+                output_dir=output_dir,
+                output_prefix=f"sound_video_{index+1:02d}",
+                text_prompt="cinematic sound effects, ambient sounds, facial reactions, actions",
+                negative_prompt="speech, talking, dialogue, vocals, words",
+                duration=5,
+                creativity_coef=6,
+                session=_SESSION
+            )
+    except Exception as e:
+        log.info(f"❌ Sound {index + 1} failed: {vid_base} - {e}")
+        return {
+            'index': index,
+            'video_path': video_path,
+            'success': False,
+            'error': str(e)
+        }
+
+    log.info(f"✅ Sound {index + 1} completed: {len(sound_video_paths)} file(s)")
+    return {
+        'index': index,
+        'video_path': video_path,
+        'sound_video_paths': sound_video_paths,
+        'success': True
+    }
+
+async def _run_pipeline(uploaded_files: List[str], image_prompts: List[Optional[str]], add_sound: bool, output_dir: str) -> tuple:
+    """Run video (and optionally sound) generation as one streaming pipeline.
+
+    Sound generation for each clip is kicked off as soon as its video
+    finishes rather than waiting for the whole video phase to drain.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def run_one(index: int, image_path: str) -> tuple:
+        # The API clients are synchronous (requests), so run them on the
+        # shared module-level pools; pool sizes bound stage concurrency
+        # Only download the video locally when the sound stage needs it;
+        # otherwise clients use the provider's CDN URL directly
+        video_result = await loop.run_in_executor(
+            VIDEO_POOL, process_single_image, image_path, index,
+            output_dir, image_prompts[index], add_sound
+        )
+        if not add_sound or not video_result['success']:
+            return video_result, None
+        sound_result = await loop.run_in_executor(
+            SOUND_POOL, process_single_sound, video_result, output_dir
+        )
+        return video_result, sound_result
+
+    results = await asyncio.gather(*(
+        run_one(i, img_path) for i, img_path in enumerate(uploaded_files)
+    ))
+    video_results = [video for video, _ in results]
+    sound_results = [sound for _, sound in results if sound is not None]
+    return video_results, sound_results
+
+
+def _run_batch(uploaded_files: List[str], image_prompts: List[Optional[str]],
+               add_sound: bool, output_dir: str) -> tuple:
+    """Submit every image in one upstream request, then run the sound jobs.
+
+    Amortizes the per-request HTTP fixed costs across the whole batch;
+    enabled via USE_BATCH_API=1.
+    """
+    output_paths = None
+    if add_sound:  # only the sound stage needs local copies
+        output_paths = [os.path.join(output_dir, f"video_{i+1:02d}.mp4")
+                        for i in range(len(uploaded_files))]
+    prompts = [f"{SYSTEM_PROMPT}, {p}" if p else SYSTEM_PROMPT for p in image_prompts]
+
+    with UPSTREAM_SEM:
+        raw_results = generate_videos_from_images(
+            uploaded_files, output_paths, prompts,
+            duration=5, model="bytedance:1@1", width=1248, height=704, fps=24,
+            session=_SESSION
+        )
+
+    video_results = []
+    for i, raw in enumerate(raw_results):
+        img_base = os.path.basename(uploaded_files[i])
+        if 'error' in raw:
+            log.info(f"❌ Video {i + 1} failed: {img_base} - {raw['error']}")
+            video_results.append({
+                'index': i,
+                'image_filename': img_base,
+                'success': False,
+                'error': raw['error']
+            })
+            continue
+        video_result = {
+            'index': i,
+            'image_filename': img_base,
+            'video_url': raw['videoURL'],
+            'model_used': "bytedance:1@1",
+            'success': True
+        }
+        if add_sound:
+            video_result['video_filename'] = os.path.basename(output_paths[i])
+            video_result['video_path'] = output_paths[i]
+        video_results.append(video_result)
+
+    sound_results = []
+    if add_sound:
+        successful = [r for r in video_results if r['success']]
+        futures = [SOUND_POOL.submit(process_single_sound, r, output_dir) for r in successful]
+        sound_results = [f.result() for f in futures]
+    return video_results, sound_results
+
+
+def run_pipeline(uploaded_files: List[str], image_prompts: List[Optional[str]],
+                 add_sound: bool, output_dir: str,
+                 cleanup_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Run the full pipeline and build the response payload.
+
+    Entry point for both inline execution and RQ jobs. When cleanup_dir
+    is given (the per-job upload directory), it is removed once the
+    pipeline is done with the files.
+    """
+    try:
+        if os.environ.get('USE_BATCH_API') == '1' and len(uploaded_files) > 1:
+            video_results, sound_results = _run_batch(
+                uploaded_files, image_prompts, add_sound, output_dir
+            )
+        else:
+            video_results, sound_results = asyncio.run(
+                _run_pipeline(uploaded_files, image_prompts, add_sound, output_dir)
+            )
+    finally:
+        if cleanup_dir:
+            shutil.rmtree(cleanup_dir, ignore_errors=True)
+
+    # gather preserves submission order, so results arrive index-ordered
+    successful_videos = [r for r in video_results if r['success']]
+
+    response_data = {
+        'video_results': video_results,
+        'successful_videos': len(successful_videos),
+        'total_videos': len(video_results)
+    }
+
+    if add_sound and successful_videos:
+        response_data['sound_results'] = sound_results
+        response_data['successful_sounds'] = len([r for r in sound_results if r['success']])
+
+    return response_data
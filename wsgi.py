@@ -0,0 +1,6 @@
+"""WSGI entrypoint for production servers.
+
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from server import app  # noqa: F401